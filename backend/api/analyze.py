@@ -1,6 +1,10 @@
-import torch
+import time
 import numpy as np
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from api.encoding import NDJSON, PACKED, negotiate, ndjson, pack
+from api.inference import server_timing
+from config.settings import Config
 from pydantic import BaseModel
 from typing import List, Optional
 
@@ -23,93 +27,398 @@ class AnalyzeResponse(BaseModel):
     portfolio_impact: float
     analysis_timestamp: str
 
+class PortfolioScenario(BaseModel):
+    portfolio: List[PortfolioStock]
+    shocks: List[ShockRequest]
+
+class BatchAnalyzeResponse(BaseModel):
+    results: List[AnalyzeResponse]
+
+class ShockGrid(BaseModel):
+    stocks: Optional[List[str]] = None
+    min_change: float = -30.0
+    max_change: float = 30.0
+    step: float = 1.0
+
+class SweepRequest(BaseModel):
+    portfolio: List[PortfolioStock]
+    scenarios: List[List[ShockRequest]] = []
+    grid: Optional[ShockGrid] = None
+
+class SweepResponse(BaseModel):
+    stocks: List[str]
+    correlations: List[Optional[float]]
+    scenarios: List[List[ShockRequest]]
+    impacts: List[List[float]]
+    portfolio_impacts: List[float]
+    analysis_timestamp: str
+
 router = APIRouter()
 
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_impact(
     request: Request,
+    response: Response,
     portfolio: List[PortfolioStock],
     shocks: List[ShockRequest]
     ):
     """Analyze portfolio impact from single or multiple stock shocks"""
-    try:
-        if not portfolio:
-            raise HTTPException(status_code=400, detail="Portfolio cannot be empty")
-        
-        if not shocks:
-            raise HTTPException(status_code=400, detail="At least one shock required")
-        
-        selected_stocks = [stock_info.stock for stock_info in portfolio]
-        total_shares = sum([stock_info.shares for stock_info in portfolio])
-        for shock in shocks:
-            if shock.stock not in selected_stocks:
-                raise HTTPException(status_code=400, detail=f"Stock {shock.stock} not in portfolio")
-        
-        stock_weights = {stock_info.stock: stock_info.shares / total_shares for stock_info in portfolio}
+    ctx = request.app.state.ctx
+    timings = {}
 
-        # Get multi-timeframe data
-        ctx = request.app.state.ctx
-        data = ctx.stock_data.get_multi_timeframe_data(selected_stocks)
-        
-        with torch.no_grad():
-            short_features = data['timeframes']['short']['features']
-            medium_features = data['timeframes']['medium']['features']
-            long_features = data['timeframes']['long']['features']
-            
-            if short_features.dim() == 2:
-                short_features = short_features.unsqueeze(1)
-                medium_features = medium_features.unsqueeze(1)
-                long_features = long_features.unsqueeze(1)
-            
-            impacts, uncertainties = ctx.model(
-                short_features,
-                medium_features,
-                long_features,
-                data['graph'].edge_index,
-                data['graph'].edge_attr
-            )
-        
-        impacts_np = impacts.cpu().numpy()
-        uncertainties_np = uncertainties.cpu().numpy()
-        
-        stock_impacts = []
-        weighted_impact = 0
-        
-        
-        for i, stock_info in enumerate(portfolio):
-            stock = stock_info.stock
-            weight = stock_weights[stock]
-
-            direct_shock = next((s for s in shocks if s.stock == stock), None)
+    async with ctx.analysis_pool.slot():
+        try:
+            results = await _analyze_scenarios(ctx, timings, [(portfolio, shocks)])
+            encoded = _encode_results(request, timings, results)
+            if encoded is not None:
+                return encoded
+
+            response.headers['Server-Timing'] = server_timing(timings)
+            return _response_model(results[0])
             
-            if direct_shock:
-                final_impact = direct_shock.change_percent
-            else:
-                shock_effect = 0
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@router.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+async def analyze_batch(request: Request, response: Response, scenarios: List[PortfolioScenario]):
+    """Analyze many (portfolio, shocks) scenarios with one batched model pass"""
+    ctx = request.app.state.ctx
+    timings = {}
+
+    async with ctx.analysis_pool.slot():
+        try:
+            if not scenarios:
+                raise HTTPException(status_code=400, detail="At least one scenario required")
+
+            results = await _analyze_scenarios(ctx, timings, [(scenario.portfolio, scenario.shocks) for scenario in scenarios])
+            encoded = _encode_results(request, timings, results)
+            if encoded is not None:
+                return encoded
+
+            response.headers['Server-Timing'] = server_timing(timings)
+            return BatchAnalyzeResponse(results=[_response_model(result) for result in results])
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@router.post("/analyze/sweep", response_model=SweepResponse)
+async def analyze_sweep(request: Request, response: Response, sweep: SweepRequest):
+    """Evaluate a grid of shock scenarios against one portfolio with a single model pass.
+
+    Only the propagation depends on the shocks, so features, graph and model outputs are
+    computed once and every scenario is evaluated as one matrix product. Send
+    `Accept: application/x-ndjson` to stream one line per scenario instead, or
+    `Accept: application/x-simfolio-packed` for the matrices as packed float64.
+    """
+    ctx = request.app.state.ctx
+    timings = {}
+
+    async with ctx.analysis_pool.slot():
+        try:
+            scenarios = list(sweep.scenarios)
+            if sweep.grid is not None:
+                scenarios += _grid_scenarios(sweep.portfolio, sweep.grid, Config.max_sweep_scenarios - len(scenarios))
+            if not scenarios:
+                raise HTTPException(status_code=400, detail="Provide scenarios or a grid")
+            if len(scenarios) > Config.max_sweep_scenarios:
+                raise HTTPException(status_code=400, detail=f"Sweep limited to {Config.max_sweep_scenarios} scenarios")
+
+            selected_stocks = _validate_scenario(sweep.portfolio, scenarios[0])
+            held = set(selected_stocks)
+            for shocks in scenarios:
+                if not shocks:
+                    raise HTTPException(status_code=400, detail="At least one shock required")
                 for shock in shocks:
-                    shock_idx = selected_stocks.index(shock.stock)
-                    correlation = data['correlations'].iloc[i, shock_idx]
-                    shock_effect += shock.change_percent * 0.6 * correlation + impacts_np[i] * shock.change_percent * 0.4
-                
-                final_impact = shock_effect / len(shocks) if shocks else 0
-            
-            weighted_impact += final_impact * weight
-
-            confidence = 1 - uncertainties_np[i]
-
-            stock_impacts.append(StockImpact(
-                stock=stock,
-                impact_percent=round(final_impact, 2),
-                correlation=round(data['correlations'].iloc[i].mean(), 3) if i < len(data['correlations']) else None
-            ))
-        
-        return AnalyzeResponse(
-            shocked_stocks=[s.stock for s in shocks],
-            impacts=stock_impacts,
-            portfolio_impact=round(weighted_impact, 2),
+                    if shock.stock not in held:
+                        raise HTTPException(status_code=400, detail=f"Stock {shock.stock} not in portfolio")
+
+            version = await ctx.cache_version(timings)
+            (data, impacts_np, _), = await _predictions(ctx, timings, version, [selected_stocks])
+            evaluator = _PortfolioSweep(sweep.portfolio, data, impacts_np)
+
+            media_type = negotiate(request)
+            if media_type == NDJSON:
+                return StreamingResponse(ndjson(evaluator.records(scenarios)), media_type=NDJSON,
+                                         headers={'Server-Timing': server_timing(timings)})
+            if media_type == PACKED:
+                payload = await ctx.analysis_pool.run('sweep', timings, evaluator.packed, scenarios)
+                return Response(payload, media_type=PACKED, headers={'Server-Timing': server_timing(timings)})
+
+            result = await ctx.analysis_pool.run('sweep', timings, evaluator.response, scenarios)
+            response.headers['Server-Timing'] = server_timing(timings)
+            return result
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+async def _analyze_scenarios(ctx, timings, scenarios):
+    """Result dict per (portfolio, shocks), reusing cached results and cached model outputs.
+
+    Full responses are cached per exact request; model outputs per stock list, since
+    they don't depend on the shocks. Both caches are tied to the current checkpoint
+    and price data version.
+    """
+    pool = ctx.analysis_pool
+    selections = [_validate_scenario(portfolio, shocks) for portfolio, shocks in scenarios]
+    keys = [_scenario_key(portfolio, shocks) for portfolio, shocks in scenarios]
+    version = await ctx.cache_version(timings)
+
+    results = [ctx.result_cache.get(key, version) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    if pending:
+        predictions = await _predictions(ctx, timings, version, [selections[i] for i in pending])
+        built = await pool.run('response', timings, _build_results, [scenarios[i] for i in pending], predictions)
+        for i, result in zip(pending, built):
+            ctx.result_cache.put(keys[i], version, result)
+            results[i] = result
+
+    timestamp = np.datetime64('now').astype(str)
+    return [dict(result, analysis_timestamp=timestamp) for result in results]
+
+def _response_model(result):
+    return AnalyzeResponse(
+        shocked_stocks=result['shocked_stocks'],
+        impacts=[
+            StockImpact(stock=stock, impact_percent=impact, correlation=correlation)
+            for stock, impact, correlation in zip(result['stocks'], result['impacts'], result['correlations'])
+        ],
+        portfolio_impact=result['portfolio_impact'],
+        analysis_timestamp=result['analysis_timestamp']
+    )
+
+def _encode_results(request, timings, results):
+    """Streamed NDJSON or packed response if the client opted in via Accept, otherwise None.
+
+    Both skip the per-row pydantic models: NDJSON sends one line per scenario followed by
+    one line per stock, packed sends the rows as float64 columns.
+    """
+    media_type = negotiate(request)
+    headers = {'Server-Timing': server_timing(timings)}
+    if media_type == NDJSON:
+        return StreamingResponse(ndjson(_result_records(results)), media_type=NDJSON, headers=headers)
+    if media_type == PACKED:
+        return Response(_pack_results(results), media_type=PACKED, headers=headers)
+    return None
+
+def _result_records(results):
+    for k, result in enumerate(results):
+        yield {
+            'scenario': k,
+            'shocked_stocks': result['shocked_stocks'],
+            'portfolio_impact': result['portfolio_impact'],
+            'analysis_timestamp': result['analysis_timestamp']
+        }
+        for stock, impact, correlation in zip(result['stocks'], result['impacts'], result['correlations']):
+            yield {'scenario': k, 'stock': stock, 'impact_percent': impact, 'correlation': correlation}
+
+def _pack_results(results):
+    """Scenario metadata and stock names in the header; impact_percent and correlation
+    (NaN where missing) as columns, scenario k owning rows offset:offset+rows"""
+    header = {'results': [], 'stocks': []}
+    offset = 0
+    for result in results:
+        rows = len(result['stocks'])
+        header['results'].append({
+            'shocked_stocks': result['shocked_stocks'],
+            'portfolio_impact': result['portfolio_impact'],
+            'analysis_timestamp': result['analysis_timestamp'],
+            'offset': offset,
+            'rows': rows
+        })
+        header['stocks'] += result['stocks']
+        offset += rows
+
+    impacts = np.array([impact for result in results for impact in result['impacts']], dtype=np.float64)
+    correlations = np.array([np.nan if correlation is None else correlation
+                             for result in results for correlation in result['correlations']], dtype=np.float64)
+    return pack(header, {'impact_percent': impacts, 'correlation': correlations})
+
+async def _predictions(ctx, timings, version, selections):
+    """(data, impacts, uncertainties) per stock list, from the prediction cache or one batched model pass"""
+    pool = ctx.analysis_pool
+    predictions = [ctx.prediction_cache.get(tuple(selected_stocks), version) for selected_stocks in selections]
+
+    missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+    if missing:
+        data_list = await pool.map('data', timings, ctx.stock_data.get_multi_timeframe_data,
+                                   [selections[i] for i in missing])
+
+        start = time.perf_counter()
+        outputs = await ctx.scheduler.predict_many(data_list)
+        pool.record('model', timings, time.perf_counter() - start)
+
+        for i, data, (impacts_np, uncertainties_np) in zip(missing, data_list, outputs):
+            predictions[i] = ({'correlations': data['correlations']}, impacts_np, uncertainties_np)
+            ctx.prediction_cache.put(tuple(selections[i]), version, predictions[i])
+    return predictions
+
+def _scenario_key(portfolio, shocks):
+    """Hashable canonical form of a request; order is kept since it fixes the response order"""
+    return (
+        tuple((stock_info.stock, stock_info.shares) for stock_info in portfolio),
+        tuple((shock.stock, float(shock.change_percent)) for shock in shocks)
+    )
+
+def _validate_scenario(portfolio, shocks):
+    """Check a portfolio/shock pair and return the portfolio's stocks"""
+    if not portfolio:
+        raise HTTPException(status_code=400, detail="Portfolio cannot be empty")
+    
+    if not shocks:
+        raise HTTPException(status_code=400, detail="At least one shock required")
+    
+    selected_stocks = [stock_info.stock for stock_info in portfolio]
+    for shock in shocks:
+        if shock.stock not in selected_stocks:
+            raise HTTPException(status_code=400, detail=f"Stock {shock.stock} not in portfolio")
+    return selected_stocks
+
+def _build_results(scenarios, predictions):
+    return [
+        _build_result(portfolio, shocks, data, impacts_np, uncertainties_np)
+        for (portfolio, shocks), (data, impacts_np, uncertainties_np) in zip(scenarios, predictions)
+    ]
+
+def _build_result(portfolio, shocks, data, impacts_np, uncertainties_np):
+    """Propagate the shocks through correlations and model impacts for one portfolio.
+
+    Returns plain lists rather than StockImpact models so the streaming and packed
+    encoders can use them directly.
+    """
+    selected_stocks = [stock_info.stock for stock_info in portfolio]
+    total_shares = sum([stock_info.shares for stock_info in portfolio])
+    stock_weights = {stock_info.stock: stock_info.shares / total_shares for stock_info in portfolio}
+    weights = np.array([stock_weights[stock] for stock in selected_stocks])
+
+    correlations = np.asarray(data['correlations'], dtype=np.float64)
+    final_impacts = propagate_shocks(correlations, impacts_np, selected_stocks, shocks)
+    mean_correlations = correlations.mean(axis=1).tolist()
+
+    return {
+        'shocked_stocks': [s.stock for s in shocks],
+        'stocks': selected_stocks,
+        'impacts': [round(final_impact, 2) for final_impact in final_impacts.tolist()],
+        'correlations': [round(mean_correlations[i], 3) if i < len(mean_correlations) else None
+                         for i in range(len(selected_stocks))],
+        'portfolio_impact': round(float(final_impacts @ weights), 2),
+        'analysis_timestamp': np.datetime64('now').astype(str)
+    }
+
+def propagate_shocks(correlations, impacts_np, selected_stocks, shocks):
+    """Final per-stock impact of one set of shocks; see propagate_scenarios"""
+    return propagate_scenarios(correlations, impacts_np, selected_stocks, [shocks])[0]
+
+def propagate_scenarios(correlations, impacts_np, selected_stocks, scenarios):
+    """Scenario x stock matrix of final impacts.
+
+    A shocked stock (every row of it, if listed twice) takes its own first shock; every
+    other stock the average over the scenario's shocks of 0.6 * change * corr(stock, shocked)
+    + 0.4 * change * impact, correlating with the shocked stock's first row. Shocks are
+    scattered into a scenario x stock matrix so all scenarios share one matmul.
+    """
+    rows = {}
+    for i, stock in enumerate(selected_stocks):
+        rows.setdefault(stock, []).append(i)
+
+    shape = (len(scenarios), len(selected_stocks))
+    shocked = np.zeros(shape)
+    direct = np.zeros(shape)
+    is_direct = np.zeros(shape, dtype=bool)
+    for k, shocks in enumerate(scenarios):
+        for shock in shocks:
+            stock_rows = rows[shock.stock]
+            shocked[k, stock_rows[0]] += shock.change_percent
+            if not is_direct[k, stock_rows[0]]:
+                is_direct[k, stock_rows] = True
+                direct[k, stock_rows] = shock.change_percent
+    counts = np.array([len(shocks) for shocks in scenarios], dtype=np.float64)
+
+    impacts = np.asarray(impacts_np, dtype=np.float64)
+    effects = (0.6 * shocked @ correlations.T + 0.4 * np.outer(shocked.sum(axis=1), impacts)) / counts[:, None]
+    return np.where(is_direct, direct, effects)
+
+def _grid_scenarios(portfolio, grid, limit=Config.max_sweep_scenarios):
+    """One single-stock scenario per (stock, change) on the grid, stock-major; 400 if that is over limit"""
+    if grid.step <= 0 or grid.max_change < grid.min_change:
+        raise HTTPException(status_code=400, detail="Grid needs step > 0 and max_change >= min_change")
+    count = int(np.floor((grid.max_change - grid.min_change) / grid.step + 1e-9)) + 1
+    stocks = grid.stocks if grid.stocks is not None else list(dict.fromkeys(s.stock for s in portfolio))
+    # Reject before building anything: the grid is count scenarios per stock
+    if count * len(stocks) > limit:
+        raise HTTPException(status_code=400, detail=f"Sweep limited to {Config.max_sweep_scenarios} scenarios")
+    changes = np.round(grid.min_change + grid.step * np.arange(count), 10).tolist()
+
+    return [[ShockRequest(stock=stock, change_percent=change)] for stock in stocks for change in changes]
+
+class _PortfolioSweep:
+    """Propagates scenario chunks against one portfolio's cached model outputs"""
+    def __init__(self, portfolio, data, impacts_np):
+        self.stocks = [stock_info.stock for stock_info in portfolio]
+        total_shares = sum([stock_info.shares for stock_info in portfolio])
+        stock_weights = {stock_info.stock: stock_info.shares / total_shares for stock_info in portfolio}
+        self.weights = np.array([stock_weights[stock] for stock in self.stocks])
+        self.correlations = np.asarray(data['correlations'], dtype=np.float64)
+        self.impacts = impacts_np
+        mean_correlations = np.round(self.correlations.mean(axis=1), 3).tolist()
+        self.mean_correlations = [mean_correlations[i] if i < len(mean_correlations) else None
+                                  for i in range(len(self.stocks))]
+
+    def chunks(self, scenarios, chunk_size=Config.sweep_chunk_size):
+        """(scenarios, rounded impact rows, rounded portfolio impacts) per chunk"""
+        for start in range(0, len(scenarios), chunk_size):
+            chunk = scenarios[start:start + chunk_size]
+            final_impacts = propagate_scenarios(self.correlations, self.impacts, self.stocks, chunk)
+            yield chunk, np.round(final_impacts, 2).tolist(), np.round(final_impacts @ self.weights, 2).tolist()
+
+    def response(self, scenarios):
+        impacts, portfolio_impacts = [], []
+        for _, rows, totals in self.chunks(scenarios):
+            impacts += rows
+            portfolio_impacts += totals
+        return SweepResponse(
+            stocks=self.stocks,
+            correlations=self.mean_correlations,
+            scenarios=scenarios,
+            impacts=impacts,
+            portfolio_impacts=portfolio_impacts,
             analysis_timestamp=np.datetime64('now').astype(str)
         )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+    def records(self, scenarios):
+        """Header record with stocks and correlations, then one record per scenario"""
+        yield {
+            'stocks': self.stocks,
+            'correlations': self.mean_correlations,
+            'analysis_timestamp': np.datetime64('now').astype(str)
+        }
+        for chunk, rows, totals in self.chunks(scenarios):
+            for shocks, row, total in zip(chunk, rows, totals):
+                yield {
+                    'shocks': [{'stock': shock.stock, 'change_percent': shock.change_percent} for shock in shocks],
+                    'impacts': row,
+                    'portfolio_impact': total
+                }
+
+    def packed(self, scenarios):
+        """Scenario x stock impacts and per-scenario portfolio impacts as packed float64"""
+        final_impacts = np.concatenate([
+            propagate_scenarios(self.correlations, self.impacts, self.stocks, scenarios[start:start + Config.sweep_chunk_size])
+            for start in range(0, len(scenarios), Config.sweep_chunk_size)
+        ])
+        header = {
+            'stocks': self.stocks,
+            'correlations': self.mean_correlations,
+            'scenarios': [[[shock.stock, shock.change_percent] for shock in shocks] for shocks in scenarios],
+            'analysis_timestamp': np.datetime64('now').astype(str)
+        }
+        return pack(header, {
+            'impacts': np.round(final_impacts, 2),
+            'portfolio_impacts': np.round(final_impacts @ self.weights, 2)
+        })
@@ -0,0 +1,58 @@
+import time
+import threading
+from collections import OrderedDict
+
+class ResultCache:
+    """Thread-safe LRU cache with TTL whose entries are tied to a (model, data) version.
+
+    Looking up with a version different from the one the entries were stored under
+    drops everything, so a data refresh or a new checkpoint invalidates the cache
+    without any explicit hook.
+    """
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._sync_version(version)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def _sync_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
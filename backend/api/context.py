@@ -1,22 +1,64 @@
 import torch
+import hashlib
 from pathlib import Path
 from data.core import StockData
-from train.models import TemporalGNN
+from train.export import load_model
 from config.settings import Config
+from api.inference import InferenceScheduler, AnalysisPool
+from api.cache import ResultCache
+from api.shared_weights import SharedWeights
 
 class AppContext:
     def __init__(self):
-        self.model_path = str(Config.model_dir / "temporal_gnn_2.pt")
+        if Config.torch_threads:
+            torch.set_num_threads(Config.torch_threads)
+        # Shared mode maps whatever checkpoint serve.py last published
+        self.shared_weights = SharedWeights() if Config.shared_weights else None
+        if self.shared_weights:
+            self.model_path = self.shared_weights.current()
+        else:
+            self.model_path = str(Config.model_dir / "temporal_gnn_2.pt")
+        self.inference_backend = Config.inference_backend
+        self.inference_precision = Config.inference_precision
         self.stock_data = StockData()
         self.all_stocks = self.stock_data.stock_universe
         self.model = self._load_model(self.model_path)
+        self.model_hash = self._checkpoint_hash(self.model_path)
+        self.scheduler = InferenceScheduler(self.model)
+        self.analysis_pool = AnalysisPool()
+        self.result_cache = ResultCache(Config.result_cache_size, Config.result_cache_ttl)
+        self.prediction_cache = ResultCache(Config.result_cache_size, Config.result_cache_ttl)
+
+    def reload_model(self, model_path=None):
+        """Swap in a checkpoint; cached results keyed to the old one stop matching"""
+        if model_path is None and self.shared_weights:
+            model_path = self.shared_weights.current()
+        model_path = model_path or self.model_path
+        model = self._load_model(model_path)
+        self.model, self.model_path = model, model_path
+        self.model_hash = self._checkpoint_hash(model_path)
+        self.scheduler.model = model
+
+    async def cache_version(self, timings):
+        """Everything besides the request that determines an analysis result.
+
+        Checking the cache files (and reloading the store if they changed) blocks, so when
+        it is due it runs on the analysis pool; otherwise the loaded version is read as is.
+        """
+        price_store = self.stock_data.price_store
+        if price_store.stale:
+            snapshot = await self.analysis_pool.run('refresh', timings, lambda: price_store.snapshot)
+        else:
+            snapshot = price_store.current
+        return self.model_hash, snapshot.version
 
     def _load_model(self, model_path):
         try:
-            model = TemporalGNN()
-            checkpoint = torch.load(model_path, map_location='cpu')
-            model.load_state_dict(checkpoint)
-            model.eval()
-            return model
+            return load_model(model_path, self.inference_backend, self.inference_precision,
+                              mmap=self.shared_weights is not None)
         except Exception as e:
             raise RuntimeError(f"Failed to load model from {model_path}: {e}")
+
+    def _checkpoint_hash(self, model_path):
+        with open(model_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
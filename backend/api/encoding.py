@@ -0,0 +1,64 @@
+import json
+import numpy as np
+from pydantic_core import to_json
+
+# Opt-in response formats selected by the Accept header; anything else gets the JSON models.
+# Packed layout mirrors the bar cache: magic, uint32 header length, JSON header, padding to
+# DATA_ALIGN, then each array in header['arrays'] order as contiguous little-endian float64
+NDJSON = "application/x-ndjson"
+PACKED = "application/x-simfolio-packed"
+PACKED_MAGIC = b"SFPACK1\n"
+DATA_ALIGN = 64
+
+def negotiate(request):
+    """NDJSON or PACKED if the client asked for it, otherwise None for the default JSON response"""
+    accept = request.headers.get('accept', '')
+    for media_type in (PACKED, NDJSON):
+        if media_type in accept:
+            return media_type
+    return None
+
+def ndjson(records, chunk_size=256):
+    """Encode an iterable of dicts as newline-delimited JSON, yielding a few hundred lines at a time.
+
+    Lines go through pydantic-core's serializer, several times faster than json.dumps per record.
+    """
+    lines = []
+    for record in records:
+        lines.append(to_json(record))
+        if len(lines) >= chunk_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+def pack(header, arrays):
+    """Packed payload of a JSON header plus named float64 arrays"""
+    arrays = {name: np.ascontiguousarray(values, dtype='<f8') for name, values in arrays.items()}
+    header = dict(header, arrays=[{'name': name, 'shape': list(values.shape)} for name, values in arrays.items()])
+    header_bytes = json.dumps(header).encode()
+    offset = _data_offset(len(header_bytes))
+
+    parts = [PACKED_MAGIC, np.uint32(len(header_bytes)).tobytes(), header_bytes,
+             b"\0" * (offset - len(PACKED_MAGIC) - 4 - len(header_bytes))]
+    parts += [values.tobytes() for values in arrays.values()]
+    return b"".join(parts)
+
+def unpack(payload):
+    """Inverse of pack: (header, {name: array}) with arrays viewing the payload"""
+    if payload[:len(PACKED_MAGIC)] != PACKED_MAGIC:
+        raise ValueError("Not a packed payload")
+    length = int(np.frombuffer(payload, dtype=np.uint32, count=1, offset=len(PACKED_MAGIC))[0])
+    header = json.loads(payload[len(PACKED_MAGIC) + 4:len(PACKED_MAGIC) + 4 + length])
+
+    offset = _data_offset(length)
+    arrays = {}
+    for spec in header['arrays']:
+        count = int(np.prod(spec['shape']))
+        arrays[spec['name']] = np.frombuffer(payload, dtype='<f8', count=count, offset=offset).reshape(spec['shape'])
+        offset += 8 * count
+    return header, arrays
+
+def _data_offset(header_length):
+    offset = len(PACKED_MAGIC) + 4 + header_length
+    return -(-offset // DATA_ALIGN) * DATA_ALIGN
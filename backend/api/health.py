@@ -14,6 +14,14 @@ async def health_check(request: Request):
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
             "model_exists": model_exists,
+            "model_version": ctx.model_hash,
+            "worker_pid": os.getpid(),
+            "inference_backend": ctx.inference_backend,
+            "inference_precision": ctx.inference_precision,
+            "inference": ctx.scheduler.stats(),
+            "analysis": ctx.analysis_pool.stats(),
+            "result_cache": ctx.result_cache.stats(),
+            "prediction_cache": ctx.prediction_cache.stats(),
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
\ No newline at end of file
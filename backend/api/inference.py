@@ -0,0 +1,148 @@
+import time
+import asyncio
+import threading
+import numpy as np
+from collections import deque, defaultdict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from config.settings import Config
+from data.batching import predict_batch
+
+class InferenceScheduler:
+    """Micro-batches concurrent model calls: requests arriving within one window share a forward pass.
+
+    The model only ever runs on the scheduler's single worker thread, so the event loop
+    stays free while a batch is in flight and requests queue up for the next one.
+    """
+    def __init__(self, model, window_ms=Config.batch_window_ms, max_batch_size=Config.max_batch_size,
+                 history=10000):
+        self.model = model
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._latencies = deque(maxlen=history)
+        self._batch_sizes = deque(maxlen=history)
+        self._completed = 0
+        self._started = time.monotonic()
+
+    async def predict(self, data):
+        """(impacts, uncertainties) for one portfolio's data, resolved when its batch finishes"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        await self._queue.put((data, future, time.perf_counter()))
+        return await future
+
+    async def predict_many(self, data_list):
+        return await asyncio.gather(*(self.predict(data) for data in data_list))
+
+    def stats(self):
+        """Latency percentiles (ms), throughput and batch sizes over the recent history"""
+        latencies = np.array(self._latencies) * 1000
+        return {
+            'requests': self._completed,
+            'p50_ms': round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+            'p99_ms': round(float(np.percentile(latencies, 99)), 3) if len(latencies) else None,
+            'throughput_rps': round(self._completed / (time.monotonic() - self._started), 2),
+            'mean_batch_size': round(float(np.mean(self._batch_sizes)), 2) if self._batch_sizes else None,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(items) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                predictions = await loop.run_in_executor(
+                    self._executor, predict_batch, self.model, [data for data, _, _ in items])
+            except Exception as e:
+                for _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for (_, future, submitted), prediction in zip(items, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+                self._latencies.append(finished - submitted)
+            self._batch_sizes.append(len(items))
+            self._completed += len(items)
+
+class AnalysisPool:
+    """Bounded worker pool for the blocking pandas/numpy stages of an analysis request.
+
+    Requests hold a slot for their whole lifetime; once queue_limit requests are in
+    flight new ones are rejected with 429 instead of piling up behind the workers.
+    """
+    def __init__(self, workers=Config.analysis_workers, queue_limit=Config.analysis_queue_limit, history=10000):
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self._pending = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+        self._stage_times = defaultdict(lambda: deque(maxlen=history))
+
+    @asynccontextmanager
+    async def slot(self):
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                self._rejected += 1
+                raise HTTPException(status_code=429, detail="Analysis queue is full, retry later")
+            self._pending += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def run(self, stage, timings, fn, *args):
+        """Run fn(*args) on a worker thread, recording its duration under `stage`"""
+        start = time.perf_counter()
+        result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        self.record(stage, timings, time.perf_counter() - start)
+        return result
+
+    async def map(self, stage, timings, fn, items):
+        """Run fn(item) for every item concurrently on the workers, recording the total under `stage`"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        results = await asyncio.gather(*(loop.run_in_executor(self._executor, fn, item) for item in items))
+        self.record(stage, timings, time.perf_counter() - start)
+        return list(results)
+
+    def record(self, stage, timings, seconds):
+        timings[stage] = timings.get(stage, 0.0) + seconds
+        self._stage_times[stage].append(seconds)
+
+    def stats(self):
+        """In-flight/rejected counts and per-stage p50/p99 (ms) over the recent history"""
+        stages = {
+            stage: {
+                'p50_ms': round(float(np.percentile(np.array(times) * 1000, 50)), 3),
+                'p99_ms': round(float(np.percentile(np.array(times) * 1000, 99)), 3),
+            }
+            for stage, times in list(self._stage_times.items()) if times
+        }
+        return {'in_flight': self._pending, 'rejected': self._rejected, 'stages': stages}
+
+def server_timing(timings):
+    """Server-Timing header value for a request's stage durations"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items())
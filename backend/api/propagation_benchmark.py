@@ -0,0 +1,106 @@
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from api.analyze import PortfolioStock, ShockRequest, _build_result, propagate_shocks
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def loop_result(portfolio, shocks, correlations, impacts_np):
+    """The per-stock, per-shock propagation loop analyze_impact used, as the reference:
+    (rounded impacts, rounded mean correlations, rounded portfolio impact)"""
+    selected_stocks = [stock_info.stock for stock_info in portfolio]
+    total_shares = sum([stock_info.shares for stock_info in portfolio])
+    stock_weights = {stock_info.stock: stock_info.shares / total_shares for stock_info in portfolio}
+
+    impacts, mean_correlations = [], []
+    weighted_impact = 0
+    for i, stock_info in enumerate(portfolio):
+        stock = stock_info.stock
+        direct_shock = next((s for s in shocks if s.stock == stock), None)
+        if direct_shock:
+            final_impact = direct_shock.change_percent
+        else:
+            shock_effect = 0
+            for shock in shocks:
+                shock_idx = selected_stocks.index(shock.stock)
+                correlation = correlations.iloc[i, shock_idx]
+                shock_effect += shock.change_percent * 0.6 * correlation + impacts_np[i] * shock.change_percent * 0.4
+            final_impact = shock_effect / len(shocks) if shocks else 0
+
+        weighted_impact += final_impact * stock_weights[stock]
+        impacts.append(round(final_impact, 2))
+        mean_correlations.append(round(correlations.iloc[i].mean(), 3) if i < len(correlations) else None)
+    return impacts, mean_correlations, round(weighted_impact, 2)
+
+def random_case(n_stocks, n_shocks, rng, repeats=0):
+    """(portfolio, shocks, correlations frame, model impacts); `repeats` stocks are listed twice"""
+    stocks = [f"S{i:04d}" for i in range(n_stocks - repeats)]
+    stocks += rng.choice(stocks, size=repeats, replace=False).tolist()
+    rng.shuffle(stocks)
+    portfolio = [PortfolioStock(stock=stock, shares=int(rng.integers(1, 100))) for stock in stocks]
+    # Duplicate shocks on one stock are allowed; the first one is its direct shock
+    shocks = [ShockRequest(stock=str(stock), change_percent=float(rng.uniform(-30, 30)))
+              for stock in rng.choice(stocks, size=n_shocks)]
+
+    factors = rng.normal(size=(n_stocks, 3))
+    corr = np.corrcoef(factors @ rng.normal(size=(3, 40)) + rng.normal(size=(n_stocks, 40)))
+    correlations = pd.DataFrame(corr, index=stocks, columns=stocks)
+    impacts_np = np.tanh(rng.normal(size=n_stocks)).astype(np.float32)
+    return portfolio, shocks, correlations, impacts_np
+
+def check_equivalence(cases, seed=0):
+    """Number of random portfolios (with repeated stocks and shocks) where the vectorized
+    result equals the loop's; raises SystemExit on the first mismatch"""
+    rng = np.random.default_rng(seed)
+    for case in range(cases):
+        n_stocks = int(rng.integers(2, 40))
+        n_shocks = int(rng.integers(1, 6))
+        repeats = int(rng.integers(0, 3)) if case % 2 else 0
+        portfolio, shocks, correlations, impacts_np = random_case(n_stocks, n_shocks, rng, min(repeats, n_stocks // 2))
+
+        expected = loop_result(portfolio, shocks, correlations, impacts_np)
+        result = _build_result(portfolio, shocks, {'correlations': correlations}, impacts_np, None)
+        actual = result['impacts'], result['correlations'], result['portfolio_impact']
+        if not np.allclose(expected[0], actual[0], rtol=0, atol=0.01 + 1e-9) or \
+                expected[1] != actual[1] or abs(expected[2] - actual[2]) > 0.01 + 1e-9:
+            raise SystemExit(f"Case {case} ({n_stocks} stocks, {n_shocks} shocks, {repeats} repeated) "
+                             f"differs from the loop:\n  loop       {expected}\n  vectorized {actual}")
+    return cases
+
+def benchmark(function, repeats):
+    """Median seconds per call"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main(args):
+    logger.info(f"Vectorized propagation matches the loop on all {check_equivalence(args.cases)} random portfolios")
+
+    rng = np.random.default_rng(args.seed)
+    portfolio, shocks, correlations, impacts_np = random_case(args.stocks, args.shocks, rng)
+    selected_stocks = [stock_info.stock for stock_info in portfolio]
+    corr = correlations.to_numpy()
+    data = {'correlations': correlations}
+
+    loop_s = benchmark(lambda: loop_result(portfolio, shocks, correlations, impacts_np), args.loop_repeats)
+    result_s = benchmark(lambda: _build_result(portfolio, shocks, data, impacts_np, None), args.repeats)
+    propagate_s = benchmark(lambda: propagate_shocks(corr, impacts_np, selected_stocks, shocks), args.repeats)
+    logger.info(f"  N={args.stocks}, S={args.shocks}: loop {loop_s * 1000:.1f}ms, vectorized response "
+                f"{result_s * 1000:.2f}ms ({loop_s / result_s:.0f}x), propagation alone {propagate_s * 1000:.3f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check vectorized shock propagation against the per-stock loop "
+                                                 "and benchmark both")
+    parser.add_argument("--stocks", type=int, default=500)
+    parser.add_argument("--shocks", type=int, default=50)
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--loop-repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,49 @@
+import os
+import glob
+import hashlib
+import logging
+from config.settings import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SharedWeights:
+    """Checkpoints published as immutable files that every serving process memory-maps.
+
+    Workers load the current file with torch.load(mmap=True) and assign the mapped tensors
+    as parameters, so all of them read one copy of the weights from the page cache. A
+    checkpoint is copied in under its content hash instead of mapped in place, so
+    overwriting the original (e.g. a training run saving over it) never changes pages a
+    worker has mapped; publishing a new one only repoints `current`.
+    """
+    def __init__(self, directory=Config.shared_weights_dir):
+        self.directory = directory
+        self.pointer = os.path.join(directory, "current")
+        os.makedirs(directory, exist_ok=True)
+
+    def publish(self, model_path):
+        """Copy a checkpoint in, make it current and return its shared path"""
+        with open(model_path, 'rb') as f:
+            payload = f.read()
+        shared_path = os.path.join(self.directory, f"temporal_gnn-{hashlib.sha256(payload).hexdigest()[:16]}.pt")
+
+        if not os.path.exists(shared_path):
+            self._write(shared_path, payload)
+        self._write(self.pointer, shared_path.encode())
+        logger.info(f"Published {model_path} as {shared_path}")
+
+        # Workers still mapping an older file keep its pages until they re-map
+        for stale_path in glob.glob(os.path.join(self.directory, "temporal_gnn-*.pt")):
+            if stale_path != shared_path:
+                os.remove(stale_path)
+        return shared_path
+
+    def current(self):
+        with open(self.pointer) as f:
+            return f.read()
+
+    def _write(self, path, payload):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
@@ -7,16 +7,77 @@ class Config:
     model_dir = parent_dir / "saved_models"
     cache_dir = parent_dir / "data/stock_cache"
 
+    # Data settings: timeframe -> (period, interval, sequence length)
+    timeframes = {
+        'short': ('1mo', '1d', 30),
+        'medium': ('3mo', '1wk', 12),
+        'long': ('6mo', '1wk', 24)
+    }
+    # 'cached' gathers per-ticker features from the universe feature cache whenever the
+    # portfolio has no gaps in the window; 'portfolio' always realigns on the portfolio's own dropna
+    feature_alignment = 'cached'
+    # Graph edge correlation: 'pearson' weights the window's returns equally, 'ewm' weights
+    # recent bars more (data/correlation.py::EWMCorrelation, halflife in bars)
+    correlation_method = os.getenv("CORRELATION_METHOD", "pearson")
+    correlation_halflife = 10
+    download_workers = 8
+    download_retries = 3
+    download_backoff = 1.0
+
+    # Incremental refresh: daily history kept per ticker, re-read overlap, restatement check
+    history_retention = '6mo'
+    refresh_overlap_days = 7
+    restatement_tolerance = 1e-4
+
+    # Serving settings: micro-batching window and cap for concurrent model calls
+    batch_window_ms = 3
+    max_batch_size = 64
+
+    # Blocking analysis stages run on a bounded pool; beyond the queue limit requests get 429
+    analysis_workers = int(os.getenv("ANALYSIS_WORKERS", "2"))
+    analysis_queue_limit = int(os.getenv("ANALYSIS_QUEUE_LIMIT", "64"))
+    torch_threads = int(os.getenv("TORCH_NUM_THREADS", "0"))
+    # serve.py: workers memory-map the checkpoint published here (tmpfs when available)
+    shared_weights = os.getenv("SHARED_WEIGHTS", "0") == "1"
+    shared_weights_dir = os.getenv("SHARED_WEIGHTS_DIR", "/dev/shm/simfolio" if os.path.isdir("/dev/shm")
+                                   else str(cache_dir / "shared_weights"))
+    # 'eager' runs TemporalGNN as is; 'torchscript' runs it frozen with scatter-op message passing (train/export.py)
+    inference_backend = os.getenv("INFERENCE_BACKEND", "eager")
+    # 'fp32', 'int8' (dynamically quantized GRU/Linear layers) or 'bf16' (train/quantize.py)
+    inference_precision = os.getenv("INFERENCE_PRECISION", "fp32")
+
+    # Analysis result caches (entries, seconds)
+    result_cache_size = 1024
+    result_cache_ttl = 300
+
+    # Scenario sweeps: largest grid accepted, scenarios propagated per matmul chunk
+    max_sweep_scenarios = 50000
+    sweep_chunk_size = 1024
+
+    # Offline backtests spread portfolios over this many processes
+    backtest_workers = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+    # Walk-forward validation: (date, portfolio) graphs per batched forward pass
+    walk_forward_chunk_size = 512
+
     # Training settings
     feature_dim = 8
     hidden_dim = 64
     temporal_dim = 128
     gnn_dim = 128
+    # AttentionGraphSAGE switches from sparse message passing to dense N x N attention at or
+    # below this many nodes (per forward, so a batch counts all its portfolios' nodes)
+    dense_attention_max_nodes = 512
+
+    # Minibatches are built in DataLoader worker processes (one core left for the optimizer
+    # step; 0 builds them inline), prefetched per worker
+    train_workers = int(os.getenv("TRAIN_WORKERS", str(min(4, (os.cpu_count() or 1) - 1))))
+    train_prefetch = 2
 
+    # batch_size: portfolios collated into one forward/backward per optimizer step
     train_curriculum = [
-            {'size': 4, 'epochs': 20, 'name': 'Small Portfolios'},
-            {'size': 8, 'epochs': 20, 'name': 'Medium Portfolios'}, 
-            {'size': 12, 'epochs': 20, 'name': 'Large Portfolios'}]
+            {'size': 4, 'epochs': 20, 'batch_size': 32, 'name': 'Small Portfolios'},
+            {'size': 8, 'epochs': 20, 'batch_size': 16, 'name': 'Medium Portfolios'}, 
+            {'size': 12, 'epochs': 20, 'batch_size': 16, 'name': 'Large Portfolios'}]
     
     # Phase-specific learning rates
     learning_rates = [0.007, 0.003, 0.0005]
@@ -0,0 +1,56 @@
+import torch
+from collections import defaultdict
+from torch_geometric.data import Data, Batch
+
+def portfolio_graph(data):
+    """One portfolio's model inputs as a graph: short/medium/long sequences per node plus edges"""
+    timeframes = data['timeframes']
+    return Data(
+        x=timeframes['short']['features'],
+        medium=timeframes['medium']['features'],
+        long=timeframes['long']['features'],
+        edge_index=data['graph'].edge_index,
+        edge_attr=data['graph'].edge_attr
+    )
+
+def collate_portfolios(data_list):
+    """Disjoint-union batches of portfolios, one per distinct set of sequence lengths.
+
+    GRU inputs can only be stacked when every portfolio has the same number of bars per
+    timeframe, which holds unless some stocks have gaps. Returns [(indices, batch)], where
+    batch.ptr[k]:batch.ptr[k+1] are the nodes of data_list[indices[k]].
+    """
+    groups = defaultdict(list)
+    for i, data in enumerate(data_list):
+        key = tuple(data['timeframes'][tf]['features'].shape[1:] for tf in ('short', 'medium', 'long'))
+        groups[key].append(i)
+
+    return [(indices, Batch.from_data_list([portfolio_graph(data_list[i]) for i in indices]))
+            for indices in groups.values()]
+
+def predict_batch(model, data_list):
+    """Per-portfolio (impacts, uncertainties) arrays from disjoint-union batched forward passes"""
+    predictions = [None] * len(data_list)
+    for indices, batch in collate_portfolios(data_list):
+        with torch.no_grad():
+            short_features, medium_features, long_features = batch.x, batch.medium, batch.long
+
+            if short_features.dim() == 2:
+                short_features = short_features.unsqueeze(1)
+                medium_features = medium_features.unsqueeze(1)
+                long_features = long_features.unsqueeze(1)
+
+            impacts, uncertainties = model(
+                short_features,
+                medium_features,
+                long_features,
+                batch.edge_index,
+                batch.edge_attr
+            )
+
+        impacts_np = impacts.reshape(-1).cpu().numpy()
+        uncertainties_np = uncertainties.reshape(-1).cpu().numpy()
+        for k, i in enumerate(indices):
+            start, end = batch.ptr[k].item(), batch.ptr[k + 1].item()
+            predictions[i] = (impacts_np[start:end], uncertainties_np[start:end])
+    return predictions
@@ -0,0 +1,91 @@
+import os
+import glob
+import time
+import pickle
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from config.settings import Config
+from data.cache_utils import CACHE_EXT, load_cache_arrays, load_from_cache, load_legacy_pickle, read_cache_header
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def write_pickles(cache_dir, pickle_dir):
+    """Legacy .pkl copies of every bar cache file, in the format the old cache wrote"""
+    for cache_file in sorted(glob.glob(os.path.join(cache_dir, f"*.{CACHE_EXT}"))):
+        cache_key = os.path.basename(cache_file)
+        cached = {'data': load_from_cache(cache_key, cache_dir), 'timestamp': read_cache_header(cache_file)['timestamp']}
+        with open(os.path.join(pickle_dir, f"{cache_key[:-len(CACHE_EXT) - 1]}.pkl"), 'wb') as f:
+            pickle.dump(cached, f)
+
+def drop_page_cache(files):
+    """Ask the kernel to evict the files' clean pages; best effort, a no-op where unsupported"""
+    for file in files:
+        try:
+            fd = os.open(file, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+        except (OSError, AttributeError):
+            pass
+
+def _load_pickles(directory):
+    return [load_legacy_pickle(file)[0]['Close'] for file in sorted(glob.glob(os.path.join(directory, "*.pkl")))]
+
+def _load_arrays(directory):
+    closes = []
+    for cache_file in sorted(glob.glob(os.path.join(directory, f"*.{CACHE_EXT}"))):
+        _, _, columns = load_cache_arrays(os.path.basename(cache_file), directory)
+        close = next(values for key, values in columns.items() if key[0] == 'Close')
+        # Fault the mapped pages in so the timing includes the reads
+        close.sum()
+        closes.append(close)
+    return closes
+
+def _load_frames(directory):
+    return [load_from_cache(os.path.basename(cache_file), directory)['Close']
+            for cache_file in sorted(glob.glob(os.path.join(directory, f"*.{CACHE_EXT}")))]
+
+LOADERS = {'pickle': _load_pickles, 'bars (mmap arrays)': _load_arrays, 'bars (DataFrame)': _load_frames}
+
+def _rss_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+
+def _measure(mode, directory, queue):
+    before = _rss_kb()
+    start = time.perf_counter()
+    loaded = LOADERS[mode](directory)
+    queue.put((time.perf_counter() - start, _rss_kb() - before, len(loaded)))
+
+def measure(mode, directory, cold):
+    """(seconds, RSS growth in KB, files) for loading the universe in a fresh process"""
+    if cold:
+        drop_page_cache(glob.glob(os.path.join(directory, "*")))
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(mode, directory, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main(args):
+    with tempfile.TemporaryDirectory() as pickle_dir:
+        write_pickles(args.cache_dir, pickle_dir)
+        directories = {'pickle': pickle_dir, 'bars (mmap arrays)': args.cache_dir, 'bars (DataFrame)': args.cache_dir}
+        for mode, directory in directories.items():
+            for cold in (True, False):
+                runs = [measure(mode, directory, cold) for _ in range(args.repeats)]
+                seconds, rss_kb, files = min(runs)
+                logger.info(f"  {mode}, {'cold' if cold else 'warm'}: {files} files in {seconds * 1000:.1f}ms, "
+                            f"+{rss_kb / 1024:.1f}MB RSS")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold and warm universe load time and RSS: legacy pickles vs bar files")
+    parser.add_argument("--cache-dir", default=str(Config.cache_dir))
+    parser.add_argument("--repeats", type=int, default=3)
+    main(parser.parse_args())
@@ -1,11 +1,21 @@
 import os
+import json
+import glob
 import pickle
+import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta
 
+# Bar cache layout: magic, uint32 header length, JSON header, padding to DATA_ALIGN,
+# then int64 dates (ns since epoch, UTC) followed by one contiguous float64 array per column
+CACHE_EXT = "bars"
+CACHE_MAGIC = b"SFBARS1\n"
+DATA_ALIGN = 64
+
 def get_cache_key(stocks, period, interval):
     """Generate unique cache key"""
     stocks_key = "_".join(sorted(stocks))
-    return f"{stocks_key}_{period}_{interval}.pkl"
+    return f"{stocks_key}_{period}_{interval}.{CACHE_EXT}"
 
 def is_cache_valid(cache_file, cache_expiry_days):
     """Check if cache is still fresh"""
@@ -14,23 +24,89 @@ def is_cache_valid(cache_file, cache_expiry_days):
     file_time = datetime.fromtimestamp(os.path.getmtime(cache_file))
     return (datetime.now() - file_time) < timedelta(days=cache_expiry_days)
 
-def save_to_cache(data, cache_key, cache_dir):
-    """Save data to cache file"""
+def save_to_cache(data, cache_key, cache_dir, timestamp=None):
+    """Save data to cache file, atomically replacing any previous version"""
     cache_file = os.path.join(cache_dir, cache_key)
-    with open(cache_file, 'wb') as f:
-        pickle.dump({'data': data, 'timestamp': datetime.now()}, f)
+    index = pd.DatetimeIndex(data.index)
+    columns = [list(col) if isinstance(col, tuple) else [col] for col in data.columns]
+    header = {
+        'rows': len(data),
+        'columns': columns,
+        'column_names': list(data.columns.names),
+        'dtypes': [str(dtype) for dtype in data.dtypes],
+        'index_name': index.name,
+        'tz': str(index.tz) if index.tz is not None else None,
+        'timestamp': (timestamp or datetime.now()).isoformat(),
+    }
+    header_bytes = json.dumps(header).encode()
+    offset = _data_offset(len(header_bytes))
+
+    dates = (index.tz_convert('UTC').tz_localize(None) if index.tz is not None else index).asi8
+    values = np.ascontiguousarray(data.to_numpy(dtype=np.float64).T)
+
+    tmp_file = f"{cache_file}.tmp{os.getpid()}"
+    with open(tmp_file, 'wb') as f:
+        f.write(CACHE_MAGIC)
+        f.write(np.uint32(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        f.write(b"\0" * (offset - f.tell()))
+        f.write(dates.astype(np.int64).tobytes())
+        f.write(values.tobytes())
+    os.replace(tmp_file, cache_file)
+
+def load_cache_arrays(cache_key, cache_dir):
+    """Memory-map a cache file; returns (header, dates, {column: float64 view}) without copying"""
+    cache_file = os.path.join(cache_dir, cache_key)
+    header = read_cache_header(cache_file)
+    rows, n_cols = header['rows'], len(header['columns'])
+    if rows == 0:
+        return header, np.empty(0, dtype='datetime64[ns]'), {tuple(col): np.empty(0) for col in header['columns']}
+
+    offset = _data_offset(header['_length'])
+    dates = np.memmap(cache_file, dtype=np.int64, mode='r', offset=offset, shape=(rows,))
+    values = np.memmap(cache_file, dtype=np.float64, mode='r', offset=offset + 8 * rows, shape=(n_cols, rows))
+    columns = {tuple(col): values[i] for i, col in enumerate(header['columns'])}
+    return header, dates.view('datetime64[ns]'), columns
+
+def read_cache_header(cache_file):
+    """Read only the JSON header of a cache file"""
+    with open(cache_file, 'rb') as f:
+        if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+            raise ValueError(f"{cache_file} is not a bar cache file")
+        length = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+        header = json.loads(f.read(length))
+    header['_length'] = length
+    return header
 
 def load_from_cache(cache_key, cache_dir):
     """Load data from cache"""
-    cache_file = os.path.join(cache_dir, cache_key)
+    header, dates, columns = load_cache_arrays(cache_key, cache_dir)
+    index = pd.DatetimeIndex(np.asarray(dates), name=header['index_name'])
+    if header['tz'] is not None:
+        index = index.tz_localize('UTC').tz_convert(header['tz'])
+
+    keys = list(columns)
+    if len(header['column_names']) > 1:
+        labels = pd.MultiIndex.from_tuples(keys, names=header['column_names'])
+    else:
+        labels = pd.Index([key[0] for key in keys], name=header['column_names'][0])
+
+    arrays = [np.array(columns[key], dtype=dtype) for key, dtype in zip(keys, header['dtypes'])]
+    data = pd.DataFrame(dict(enumerate(arrays)), index=index)
+    data.columns = labels
+    return data
+
+def load_legacy_pickle(cache_file):
+    """Read a pre-bar-format pickle cache entry; returns (data, timestamp)"""
     with open(cache_file, 'rb') as f:
         cached = pickle.load(f)
-    return cached['data']
-
-def clear_cache():
-        """Clear all cached data"""
-        import os
-        import glob
-        files = glob.glob(f"{self.cache_dir}/*.pkl")
-        for file in files:
-            os.remove(file)
\ No newline at end of file
+    return cached['data'], cached['timestamp']
+
+def clear_cache(cache_dir):
+    """Clear all cached data"""
+    for file in glob.glob(os.path.join(cache_dir, f"*.{CACHE_EXT}")):
+        os.remove(file)
+
+def _data_offset(header_length):
+    offset = len(CACHE_MAGIC) + 4 + header_length
+    return -(-offset // DATA_ALIGN) * DATA_ALIGN
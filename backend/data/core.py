@@ -1,84 +1,68 @@
 import os
 import logging
 import torch
-import yfinance as yf
-import pandas as pd
 import numpy as np
 from torch_geometric.data import Data
 from config.settings import Config
 from data.stocks import TICKERS
-from data.cache_utils import get_cache_key, is_cache_valid, save_to_cache, load_from_cache
+from data.cache_utils import get_cache_key, is_cache_valid
 from data.features import process_timeframe_data
 from data.historical import get_historical_snapshot
 from data.graph import build_correlation_graph
+from data.correlation import returns_correlation
+from data.price_store import PriceStore
+from data.sources import YahooPriceSource
+from data.download import refresh_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class StockData:
-    def __init__(self, cache_dir=str(Config.cache_dir), cache_expiry_days=7):
+    def __init__(self, cache_dir=str(Config.cache_dir), cache_expiry_days=7, price_source=None):
         self.stock_universe = TICKERS
+        self.price_source = price_source or YahooPriceSource()
         self.cache_expiry_days = cache_expiry_days
         self.cache_dir = cache_dir
         os.makedirs(self.cache_dir, exist_ok=True)
+        self.price_store = PriceStore(self.stock_universe, self.cache_dir, cache_expiry_days)
     
-    def download_all_data_once(self):
-        """ONE-TIME: Download each stock individually"""
-        logger.info("Downloading all stocks individually...")
-
-        
-        timeframes = {
-            'short': ('1mo', '1d'),
-            'medium': ('3mo', '1wk'),
-            'long': ('6mo', '1wk')
-        }
+    def download_all_data_once(self, force=False):
+        """Refresh stale stocks (or all, with force): fetch bars since the last stored one and rebuild timeframes"""
+        stale = [
+            stock for stock in self.stock_universe
+            if force or any(not is_cache_valid(f"{self.cache_dir}/{get_cache_key([stock], period, interval)}", self.cache_expiry_days)
+                   for period, interval, _ in Config.timeframes.values())
+        ]
         
-        for stock in self.stock_universe:
-            for timeframe, (period, interval) in timeframes.items():
-                cache_key = get_cache_key([stock], period, interval)
-                cache_file = f"{self.cache_dir}/{cache_key}"
-                
-                if not is_cache_valid(cache_file, self.cache_expiry_days):
-                    logger.info(f"Downloading {stock} ({timeframe})...")
-                    try:
-                        data = yf.download([stock], period=period, interval=interval,
-                                        progress=False, auto_adjust=True)
-                        save_to_cache(data, cache_key, self.cache_dir)
-                    except Exception as e:
-                        logger.error(f"Failed {stock}: {e}")
+        if stale:
+            logger.info(f"Downloading {len(stale)} stocks...")
+            refreshed, failed = refresh_cache(stale, self.price_source, self.cache_dir)
+            logger.info(f"Downloaded {len(refreshed)} stocks, {len(failed)} failed")
         
-        logger.info("All stocks downloaded individually!")
+        self.price_store.reload()
+        logger.info("Stock cache is up to date")
     
-    def get_multi_timeframe_data(self, user_stocks):
-        """Inference: Combine pre-downloaded individual stock data"""
+    def get_multi_timeframe_data(self, user_stocks, alignment=Config.feature_alignment):
+        """Inference: Slice the resident price store for the user's stocks"""
         timeframe_data = {}
         
-        for timeframe, config in {
-            'short': ('1mo', '1d', 30),
-            'medium': ('3mo', '1wk', 12), 
-            'long': ('6mo', '1wk', 24)
-        }.items():
-            period, interval, seq_len = config
-            
-            # Combine individual stock data
-            combined_data = None
-            for stock in user_stocks:
-                cache_key = get_cache_key([stock], period, interval)
-                cache_file = f"{self.cache_dir}/{cache_key}"
-                
-                if not is_cache_valid(cache_file, self.cache_expiry_days):
-                    raise Exception(f"Data missing for {stock}. Run download_all_data_once() first!")
-                
-                stock_data = load_from_cache(cache_key, self.cache_dir)
-                
-                if combined_data is None:
-                    combined_data = stock_data
-                else:
-                    combined_data = pd.concat([combined_data, stock_data], axis=1)
-            
-            timeframe_data[timeframe] = process_timeframe_data(combined_data, user_stocks, seq_len)
+        for timeframe, (_, _, seq_len) in Config.timeframes.items():
+            cached = self.price_store.get_features(user_stocks, timeframe, seq_len) if alignment == 'cached' else None
+            if cached is not None:
+                prices, returns, features = cached
+                timeframe_data[timeframe] = {'features': features, 'prices': prices, 'returns': returns}
+            else:
+                close_prices = self.price_store.get_prices(user_stocks, timeframe)
+                timeframe_data[timeframe] = process_timeframe_data(close_prices, user_stocks, seq_len)
         
-        graph_data, corr_matrix = build_correlation_graph(user_stocks, timeframe_data['short']['returns'])
+        returns = timeframe_data['short']['returns']
+        precomputed = self.price_store.get_correlation(user_stocks, 'short')
+        graph_data, corr_matrix = build_correlation_graph(
+            user_stocks,
+            returns,
+            node_features=timeframe_data['short']['features'],
+            corr=precomputed[0] if precomputed is not None else returns_correlation(returns)
+        )
         
         return {
             'timeframes': timeframe_data,
@@ -0,0 +1,81 @@
+import numpy as np
+from config.settings import Config
+from data.graph import correlation_matrix, covariance_matrix
+
+class UniverseCorrelation:
+    """Return correlation/covariance of the whole universe over one timeframe window, sliced per portfolio.
+
+    method is 'pearson' (equal weights, like DataFrame.corr) or 'ewm' (EWMCorrelation).
+    """
+    def __init__(self, close, seq_len, method=Config.correlation_method, halflife=Config.correlation_halflife):
+        window = close[-seq_len:]
+        returns = window[1:] / window[:-1] - 1
+        # A portfolio whose stocks have no gaps in this window drops no rows, so its
+        # dropna/pct_change returns are exactly these rows and the slice is exact
+        self.complete = ~np.isnan(window).any(axis=0)
+        if method == 'pearson':
+            self.corr = correlation_matrix(returns)
+            self.cov = covariance_matrix(returns)
+        elif method == 'ewm':
+            # Only complete columns are ever sliced; EWM pairs depend on nothing but their own
+            # two series, so fitting those alone matches fitting any complete portfolio
+            ewm = EWMCorrelation.from_returns(returns[:, self.complete], halflife)
+            block = np.ix_(self.complete, self.complete)
+            self.corr = np.zeros((len(self.complete), len(self.complete)))
+            self.cov = np.zeros_like(self.corr)
+            self.corr[block], self.cov[block] = ewm.corr, ewm.cov
+        else:
+            raise ValueError(f"Unknown correlation method: {method}")
+
+    def submatrices(self, columns):
+        """(corr, cov) for the given universe columns, or None if the portfolio must be realigned"""
+        columns = np.asarray(columns, dtype=np.intp)
+        if not self.complete[columns].all():
+            return None
+        block = np.ix_(columns, columns)
+        return self.corr[block], self.cov[block]
+
+class EWMCorrelation:
+    """Exponentially weighted return covariance updated in O(N^2) per new bar"""
+    def __init__(self, n_assets, halflife=10):
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.mean = np.zeros(n_assets)
+        self.cov = np.zeros((n_assets, n_assets))
+        self.count = 0
+
+    def update(self, returns):
+        """Fold in one bar of returns; bars with any missing value are skipped"""
+        returns = np.asarray(returns, dtype=np.float64)
+        if np.isnan(returns).any():
+            return self
+        if self.count == 0:
+            self.mean = returns.copy()
+        else:
+            delta = returns - self.mean
+            self.mean += self.alpha * delta
+            self.cov = (1 - self.alpha) * (self.cov + self.alpha * np.outer(delta, delta))
+        self.count += 1
+        return self
+
+    @property
+    def corr(self):
+        std = np.sqrt(np.diag(self.cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.cov / np.outer(std, std)
+        return np.nan_to_num(corr, nan=0.0, posinf=0.0, neginf=0.0)
+
+    @classmethod
+    def from_returns(cls, returns, halflife=10):
+        ewm = cls(returns.shape[1], halflife)
+        for row in returns:
+            ewm.update(row)
+        return ewm
+
+def returns_correlation(returns, method=Config.correlation_method, halflife=Config.correlation_halflife):
+    """Correlation ndarray of a portfolio's return columns with the configured method, for
+    portfolios the universe matrices can't be sliced for"""
+    if method == 'pearson':
+        return correlation_matrix(returns)
+    if method == 'ewm':
+        return EWMCorrelation.from_returns(np.asarray(returns, dtype=np.float64), halflife).corr
+    raise ValueError(f"Unknown correlation method: {method}")
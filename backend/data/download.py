@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config.settings import Config
+from data.cache_utils import get_cache_key, save_to_cache, load_from_cache
+from data.sources import period_start
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WEEKLY_AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+def derive_timeframe(daily, period, interval):
+    """Cut a (period, interval) view out of daily bars, resampling to Monday-labelled weeks like yfinance"""
+    if daily.empty:
+        return daily
+    daily = daily[daily.index >= period_start(daily.index[-1], period)]
+    if interval == '1d':
+        return daily
+    if interval != '1wk':
+        raise ValueError(f"Cannot derive interval {interval} from daily bars")
+
+    aggregation = {col: WEEKLY_AGGREGATION[col[0]] for col in daily.columns}
+    weekly = daily.resample('W-MON', label='left', closed='left').agg(aggregation)
+    weekly = weekly.dropna(how='all', subset=[col for col in daily.columns if col[0] == 'Close'])
+    weekly.index.name = daily.index.name
+    return weekly
+
+def fetch_with_retry(source, ticker, retries=Config.download_retries, backoff=Config.download_backoff, **window):
+    """Fetch daily bars, retrying with exponential backoff"""
+    for attempt in range(retries):
+        try:
+            return source.fetch_daily(ticker, **window)
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            delay = backoff * 2 ** attempt
+            logger.warning(f"Fetch {ticker} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def history_cache_key(ticker):
+    """Cache key of the daily history every timeframe is derived from"""
+    return get_cache_key([ticker], 'history', '1d')
+
+def update_history(source, ticker, cache_dir, retention=Config.history_retention,
+                   overlap_days=Config.refresh_overlap_days):
+    """Bring one ticker's stored daily history up to date, fetching only bars since the last stored one.
+    
+    The fetch re-reads a few days of overlap; if those bars are missing or no longer match
+    what is stored (a gap, or a split/dividend restating adjusted history) the whole
+    retention window is fetched again instead of appending.
+    """
+    cache_file = os.path.join(cache_dir, history_cache_key(ticker))
+    stored = load_from_cache(history_cache_key(ticker), cache_dir) if os.path.exists(cache_file) else None
+
+    if stored is None or stored.empty:
+        history = fetch_with_retry(source, ticker, period=retention)
+    else:
+        fresh = fetch_with_retry(source, ticker, start=stored.index[-1] - pd.Timedelta(days=overlap_days))
+        if fresh.empty:
+            history = stored
+        elif needs_full_refetch(stored, fresh, retention):
+            logger.info(f"Stored history for {ticker} is stale or restated; fetching full window")
+            history = fetch_with_retry(source, ticker, period=retention)
+        else:
+            history = pd.concat([stored[stored.index < fresh.index[0]], fresh])
+
+    history = history[history.index >= period_start(history.index[-1], retention)]
+    save_to_cache(history, history_cache_key(ticker), cache_dir)
+    return history
+
+def needs_full_refetch(stored, fresh, retention, tolerance=Config.restatement_tolerance):
+    """Whether appending `fresh` to `stored` would leave a gap or mix differently adjusted prices"""
+    if stored.index[0] > period_start(stored.index[-1], retention) + pd.Timedelta(days=7):
+        return True
+
+    # The last stored bar may have been an intraday snapshot, so it is replaced rather than checked
+    overlap = stored.index[(stored.index >= fresh.index[0]) & (stored.index < stored.index[-1])]
+    if fresh.index[0] > stored.index[-1] or not overlap.isin(fresh.index).all():
+        return True
+    if fresh.index[(fresh.index < stored.index[-1])].difference(overlap).size:
+        return True
+
+    close = [col for col in stored.columns if col[0] == 'Close']
+    return not np.allclose(stored.loc[overlap, close].to_numpy(dtype=np.float64),
+                           fresh.loc[overlap, close].to_numpy(dtype=np.float64), rtol=tolerance)
+
+def refresh_cache(tickers, source, cache_dir, max_workers=Config.download_workers, timeframes=None):
+    """Update each ticker's daily history in a bounded pool and rewrite every timeframe from it"""
+    timeframes = timeframes or Config.timeframes
+
+    def refresh_ticker(ticker):
+        daily = update_history(source, ticker, cache_dir)
+        for period, interval, _ in timeframes.values():
+            save_to_cache(derive_timeframe(daily, period, interval),
+                          get_cache_key([ticker], period, interval), cache_dir)
+        return ticker
+
+    refreshed, failed = [], []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(refresh_ticker, ticker): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            try:
+                refreshed.append(future.result())
+            except Exception as e:
+                failed.append(futures[future])
+                logger.error(f"Failed {futures[future]}: {e}")
+
+    return refreshed, failed
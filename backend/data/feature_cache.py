@@ -0,0 +1,46 @@
+import os
+import glob
+import logging
+import numpy as np
+from data.features import compute_panel_features
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when compute_panel_features changes so files from older code are not reused
+FEATURE_VERSION = 1
+
+class FeatureCache:
+    """Universe feature tensors (tickers x seq_len x 8, float32) per timeframe, one .npy per data version.
+
+    Features only depend on each ticker's own prices, so for a window where a ticker has
+    no gaps its rows are exactly what process_timeframe_data computes for any portfolio
+    containing it. Files are memory-mapped, so processes sharing a cache directory share
+    the pages instead of each holding a copy.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = os.path.join(cache_dir, "features")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def load(self, version, timeframe, close, seq_len):
+        """Memory-mapped features for the last seq_len rows of a (dates x tickers) close matrix"""
+        cache_file = os.path.join(self.cache_dir, f"{timeframe}_{seq_len}_v{FEATURE_VERSION}_{version}.npy")
+        if not os.path.exists(cache_file):
+            features = compute_panel_features(close[-seq_len:]).astype(np.float32)
+            try:
+                tmp_file = f"{cache_file}.tmp{os.getpid()}.npy"
+                np.save(tmp_file, features)
+                os.replace(tmp_file, cache_file)
+            except OSError as e:
+                logger.warning(f"Could not write feature cache {cache_file}, keeping it in memory: {e}")
+                return features
+        return np.load(cache_file, mmap_mode='r')
+
+    def prune(self, version):
+        """Remove feature files of older data versions"""
+        for cache_file in glob.glob(os.path.join(self.cache_dir, "*.npy")):
+            if not cache_file.endswith(f"_v{FEATURE_VERSION}_{version}.npy"):
+                try:
+                    os.remove(cache_file)
+                except OSError as e:
+                    logger.warning(f"Could not remove stale feature file {cache_file}: {e}")
@@ -1,25 +1,24 @@
 import numpy as np
 import pandas as pd
 import torch
+from numpy.lib.stride_tricks import sliding_window_view
 
-def process_timeframe_data(data, user_stocks, seq_len):
-    prices = data['Close'].dropna().iloc[-seq_len:]
+def process_timeframe_data(close_prices, user_stocks, seq_len):
+    prices = close_prices.dropna().iloc[-seq_len:]
     returns = prices.pct_change().dropna()
     
-    feature_sequences = []
-    for stock in user_stocks:
-        if stock in prices.columns:
-            stock_features = []
-            for t in range(len(prices)):
-                window_prices = prices[stock].iloc[max(0, t-20):t+1]
-                window_returns = returns[stock].iloc[max(0, t-19):t+1] if t > 0 else pd.Series([0])
-                features = create_advanced_features(window_prices, window_returns)
-                stock_features.append(features)
-            feature_sequences.append(np.array(stock_features))
-        else:
-            feature_sequences.append(np.zeros((len(prices), 8)))
-    
-    feature_tensor = torch.tensor(np.array(feature_sequences), dtype=torch.float32)
+    # A stock listed twice may arrive as duplicate columns: compute it once, then give
+    # every row holding it those features, as in the per-stock loop
+    unique = prices.loc[:, ~prices.columns.duplicated()]
+    present = [stock for stock in dict.fromkeys(user_stocks) if stock in unique.columns]
+    panel_features = compute_panel_features(unique[present].to_numpy(dtype=np.float64))
+    
+    column = {stock: col for col, stock in enumerate(present)}
+    rows = [i for i, stock in enumerate(user_stocks) if stock in column]
+    feature_sequences = np.zeros((len(user_stocks), len(prices), 8))
+    feature_sequences[rows] = panel_features[[column[user_stocks[i]] for i in rows]]
+    
+    feature_tensor = torch.tensor(feature_sequences, dtype=torch.float32)
     
     return {
         'features': feature_tensor,
@@ -27,6 +26,110 @@ def process_timeframe_data(data, user_stocks, seq_len):
         'returns': returns
     }
 
+def pct_returns(prices):
+    """prices.pct_change().dropna(), computed on the ndarray when the frame has no gaps"""
+    values = prices.to_numpy(dtype=np.float64)
+    if np.isnan(values).any():
+        return prices.pct_change().dropna()
+    return pd.DataFrame(values[1:] / values[:-1] - 1, index=prices.index[1:], columns=prices.columns)
+
+def compute_panel_features(prices, window=20, rsi_period=14):
+    """Vectorized create_advanced_features for every (timestep, stock) of a (T x N) price panel.
+    
+    Returns a (N x T x 8) array matching the per-timestep loop: timestep t sees the
+    trailing window of 21 prices and the returns slice the loop used (which reaches
+    one bar past t while one is available). Rows without a full window stay zero, and
+    vol_20 stays zero while fewer than 20 returns are available (a 20-bar panel).
+    """
+    n_steps, n_stocks = prices.shape
+    features = np.zeros((n_stocks, n_steps, 8))
+    if n_steps < window:
+        return features
+    
+    steps = np.arange(window - 1, n_steps)
+    returns = prices[1:] / prices[:-1] - 1
+    ret_end = np.minimum(steps, n_steps - 2)
+    
+    # Price momentum features
+    momentum_5 = prices[steps] / prices[steps - 5] - 1
+    momentum_10 = prices[steps] / prices[steps - 10] - 1
+    momentum_20 = np.zeros_like(momentum_5)
+    full = steps >= window
+    momentum_20[full] = prices[steps[full]] / prices[steps[full] - window] - 1
+    
+    # Volatility features (the return window is one short on the last bar)
+    vol_5 = _rolling_std(returns, 5)[ret_end - 4]
+    vol_20 = np.zeros_like(vol_5)
+    has_20 = ret_end == steps
+    if has_20.any():
+        vol_20[has_20] = _rolling_std(returns, window)[ret_end[has_20] - window + 1]
+    
+    # RSI
+    deltas = np.diff(prices, axis=0)
+    avg_gain = _rolling_mean(np.where(deltas > 0, deltas, 0.0), rsi_period)[steps - rsi_period]
+    avg_loss = _rolling_mean(np.where(deltas < 0, -deltas, 0.0), rsi_period)[steps - rsi_period]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    
+    # Bollinger Band position
+    rolling_mean = _rolling_mean(prices, window)[steps - window + 1]
+    rolling_std = _rolling_std(prices, window)[steps - window + 1]
+    band_width = 4 * rolling_std
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bb_position = np.where(band_width == 0, 0.5,
+                               (prices[steps] - (rolling_mean - 2 * rolling_std)) / band_width)
+    
+    stacked = np.stack([momentum_5, momentum_10, momentum_20, vol_5, vol_20, rsi, bb_position,
+                        returns[ret_end]], axis=-1)
+    normalized = (stacked - stacked.mean(axis=-1, keepdims=True)) / (stacked.std(axis=-1, keepdims=True) + 1e-8)
+    features[:, steps] = normalized.transpose(1, 0, 2)
+    return features
+
+def _rolling_mean(values, period):
+    """Trailing mean along axis 0 via cumulative sums, aligned to the window start"""
+    cumulative = np.cumsum(values, axis=0)
+    cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), cumulative], axis=0)
+    return (cumulative[period:] - cumulative[:-period]) / period
+
+def _rolling_std(values, period):
+    """Trailing sample std along axis 0, aligned to the window start"""
+    return sliding_window_view(values, period, axis=0).std(axis=-1, ddof=1)
+
+def compute_snapshot_features(prices, returns, window=20, rsi_period=14):
+    """Vectorized create_advanced_features for every column of a (T x N) price window
+    and its (R x N) returns; returns (N x 8)"""
+    n_steps, n_stocks = prices.shape
+    if n_steps < window:
+        return np.zeros((n_stocks, 8))
+    zeros = np.zeros(n_stocks)
+    
+    # Price momentum features
+    momentum_5 = prices[-1] / prices[-6] - 1
+    momentum_10 = prices[-1] / prices[-11] - 1
+    momentum_20 = prices[-1] / prices[-21] - 1 if n_steps >= 21 else zeros
+    
+    # Volatility features
+    vol_5 = returns[-5:].std(axis=0, ddof=1) if len(returns) >= 5 else zeros
+    vol_20 = returns[-window:].std(axis=0, ddof=1) if len(returns) >= window else zeros
+    
+    # RSI
+    deltas = np.diff(prices[-(rsi_period + 1):], axis=0)
+    avg_gain = np.where(deltas > 0, deltas, 0.0).mean(axis=0)
+    avg_loss = np.where(deltas < 0, -deltas, 0.0).mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    
+    # Bollinger Band position
+    rolling_mean = prices[-window:].mean(axis=0)
+    rolling_std = prices[-window:].std(axis=0, ddof=1)
+    band_width = 4 * rolling_std
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bb_position = np.where(band_width == 0, 0.5, (prices[-1] - (rolling_mean - 2 * rolling_std)) / band_width)
+    
+    last_return = returns[-1] if len(returns) > 0 else zeros
+    features = np.stack([momentum_5, momentum_10, momentum_20, vol_5, vol_20, rsi, bb_position, last_return], axis=-1)
+    return (features - features.mean(axis=-1, keepdims=True)) / (features.std(axis=-1, keepdims=True) + 1e-8)
+
 def create_advanced_features(prices, returns):
     """Create sophisticated financial features"""
     if len(prices) < 20:
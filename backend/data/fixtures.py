@@ -0,0 +1,45 @@
+import os
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from data.stocks import TICKERS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def write_synthetic_history(root, tickers=TICKERS, start='2024-01-01', end='2025-01-01', seed=0):
+    """Write one-factor random-walk daily bars as <root>/<TICKER>.csv for CSVPriceSource.
+
+    Gives backtests and refresh code a deterministic offline dataset: business days only,
+    each ticker loading on a shared market factor so correlation graphs have edges.
+    """
+    os.makedirs(root, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end, inclusive='left', name='Date')
+
+    market = rng.normal(0.0003, 0.01, len(dates))
+    for ticker in tickers:
+        beta = rng.uniform(0.5, 1.5)
+        returns = beta * market + rng.normal(0, 0.015, len(dates))
+        close = rng.uniform(20, 400) * np.exp(np.cumsum(returns))
+        spread = np.abs(rng.normal(0, 0.01, len(dates))) * close
+        bars = pd.DataFrame({
+            'Open': close * (1 + rng.normal(0, 0.003, len(dates))),
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rng.integers(1_000_000, 50_000_000, len(dates)),
+        }, index=dates)
+        bars.to_csv(os.path.join(root, f"{ticker}.csv"))
+
+    logger.info(f"Wrote {len(tickers)} synthetic histories ({len(dates)} days) to {root}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate an offline price fixture for CSVPriceSource")
+    parser.add_argument("root")
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2025-01-01")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_history(args.root, start=args.start, end=args.end, seed=args.seed)
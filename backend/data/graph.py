@@ -1,52 +1,89 @@
 import torch
 import logging
-import yfinance as yf
+import numpy as np
+import pandas as pd
 from torch_geometric.data import Data
-from data.features import process_timeframe_data
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def build_correlation_graph(user_stocks, returns_data):
-    """Build graph from correlation matrix"""
-    corr_matrix = returns_data.corr().fillna(0)
+def build_correlation_graph(user_stocks, returns_data, node_features=None, threshold=0.2, top_k=None, corr=None):
+    """Build graph from correlation matrix; node features come from the caller's cached panel.
     
-    edges = []
-    edge_weights = []
-    
-    for i in range(len(user_stocks)):
-        for j in range(i + 1, len(user_stocks)):
-            corr = corr_matrix.iloc[i, j]
-            if abs(corr) > 0.2:
-                edges.extend([[i, j], [j, i]])
-                edge_weights.extend([corr, corr])
-
-    # Fallback connectivity
-    if len(edges) == 0:
-        logger.info(f"  ⚠️  No strong correlations found. Creating minimum graph connectivity.")
-        for i in range(len(user_stocks)):
-            correlations = corr_matrix.iloc[i].abs()
-            correlations.iloc[i] = 0
-            if len(correlations) > 1:
-                j = correlations.idxmax()
-                j_idx = user_stocks.index(j)
-                corr = corr_matrix.iloc[i, j_idx]
-                edges.extend([[i, j_idx], [j_idx, i]])
-                edge_weights.extend([corr, corr])
-    
-    if len(edges) == 0 and len(user_stocks) > 1:
-        logger.info(f"  ⚠️  Creating chain connectivity fallback.")
-        for i in range(len(user_stocks) - 1):
-            edges.extend([[i, i+1], [i+1, i]])
-            edge_weights.extend([0.1, 0.1])
-    
-    edge_index = torch.tensor(edges, dtype=torch.long).t().contiguous() if edges else torch.empty(2, 0, dtype=torch.long)
-    edge_attr = torch.tensor(edge_weights, dtype=torch.float32) if edge_weights else torch.empty(0, dtype=torch.float32)
-    
-    # Create node features from short-term data
-    short_data = yf.download(user_stocks, period='1mo', interval='1d', progress=False, auto_adjust=True)
-    short_features = process_timeframe_data(short_data, user_stocks, 30)['features']
-    
-    graph_data = Data(x=short_features, edge_index=edge_index, edge_attr=edge_attr)
-    
-    return graph_data, corr_matrix
\ No newline at end of file
+    A precomputed `corr` (e.g. a slice of the universe matrix) skips recomputing it from returns_data.
+    """
+    if corr is None:
+        corr = correlation_matrix(returns_data)
+    corr_matrix = pd.DataFrame(corr, index=returns_data.columns, columns=returns_data.columns)
+
+    edge_index, edge_attr = build_edges(corr, threshold=threshold, top_k=top_k, fallbacks=('nearest', 'chain'))
+    graph_data = Data(x=node_features, edge_index=edge_index, edge_attr=edge_attr)
+
+    return graph_data, corr_matrix
+
+def correlation_matrix(returns):
+    """Pearson correlation of return columns, NaN (e.g. zero variance) filled with 0 like corr().fillna(0)"""
+    values = np.asarray(returns, dtype=np.float64)
+    if np.isnan(values).any():
+        # Pairwise-complete observations need pandas' per-pair alignment
+        return pd.DataFrame(values).corr().fillna(0).to_numpy()
+
+    centered = values - values.mean(axis=0)
+    norms = np.sqrt(np.einsum('ij,ij->j', centered, centered))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = (centered.T @ centered) / np.outer(norms, norms)
+    return np.nan_to_num(corr, nan=0.0, posinf=0.0, neginf=0.0)
+
+def covariance_matrix(returns):
+    """Sample covariance of return columns, matching DataFrame.cov()"""
+    values = np.asarray(returns, dtype=np.float64)
+    if np.isnan(values).any():
+        return pd.DataFrame(values).cov().to_numpy()
+
+    centered = values - values.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (centered.T @ centered) / (len(values) - 1)
+
+def build_edges(corr, threshold=0.2, top_k=None, fallbacks=()):
+    """Vectorized edge extraction from an (N x N) correlation ndarray.
+
+    Keeps pairs with |corr| > threshold (optionally only each node's top_k strongest,
+    kept if either endpoint selects it). When nothing survives, the fallbacks are tried in
+    order: 'nearest' links every node to its most correlated peer, 'chain' links i to i+1.
+    Returns (edge_index, edge_attr) with both directions of every edge.
+    """
+    n_nodes = len(corr)
+    strength = np.abs(corr)
+    mask = strength > threshold
+    np.fill_diagonal(mask, False)
+
+    if top_k is not None and top_k < n_nodes - 1:
+        ranked = np.where(mask, strength, -1.0)
+        nearest = np.argpartition(-ranked, top_k, axis=1)[:, :top_k]
+        selected = np.zeros_like(mask)
+        np.put_along_axis(selected, nearest, True, axis=1)
+        mask &= selected | selected.T
+
+    src, dst = np.nonzero(np.triu(mask, k=1))
+    weights = corr[src, dst]
+
+    for fallback in fallbacks:
+        if len(src):
+            break
+        if fallback == 'nearest' and n_nodes > 1:
+            logger.info(f"  ⚠️  No strong correlations found. Creating minimum graph connectivity.")
+            np.fill_diagonal(strength, 0)
+            src = np.arange(n_nodes)
+            dst = strength.argmax(axis=1)
+            weights = corr[src, dst]
+        elif fallback == 'chain' and n_nodes > 1:
+            logger.info(f"  ⚠️  Creating chain connectivity fallback.")
+            src = np.arange(n_nodes - 1)
+            dst = src + 1
+            weights = np.full(n_nodes - 1, 0.1)
+
+    # Interleave (i, j), (j, i) per pair, the order the graph loops produced
+    edge_index = torch.from_numpy(np.stack([np.stack([src, dst], axis=1).ravel(),
+                                            np.stack([dst, src], axis=1).ravel()]).astype(np.int64))
+    edge_attr = torch.from_numpy(np.repeat(weights, 2).astype(np.float32))
+    return edge_index, edge_attr
@@ -0,0 +1,133 @@
+import time
+import logging
+import argparse
+import torch
+import numpy as np
+import pandas as pd
+from data.graph import build_correlation_graph, correlation_matrix, build_edges
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def loop_inference_graph(user_stocks, returns_data):
+    """The element-wise build_correlation_graph loop (0.2 threshold, nearest and chain fallbacks), as the reference"""
+    corr_matrix = returns_data.corr().fillna(0)
+
+    edges = []
+    edge_weights = []
+    for i in range(len(user_stocks)):
+        for j in range(i + 1, len(user_stocks)):
+            corr = corr_matrix.iloc[i, j]
+            if abs(corr) > 0.2:
+                edges.extend([[i, j], [j, i]])
+                edge_weights.extend([corr, corr])
+
+    if len(edges) == 0:
+        for i in range(len(user_stocks)):
+            correlations = corr_matrix.iloc[i].abs()
+            correlations.iloc[i] = 0
+            if len(correlations) > 1:
+                j = correlations.idxmax()
+                j_idx = user_stocks.index(j)
+                corr = corr_matrix.iloc[i, j_idx]
+                edges.extend([[i, j_idx], [j_idx, i]])
+                edge_weights.extend([corr, corr])
+
+    if len(edges) == 0 and len(user_stocks) > 1:
+        for i in range(len(user_stocks) - 1):
+            edges.extend([[i, i+1], [i+1, i]])
+            edge_weights.extend([0.1, 0.1])
+    return _tensors(edges, edge_weights), corr_matrix
+
+def loop_validation_graph(corr_matrix, stocks):
+    """The element-wise _build_graph_from_correlation loop (0.1 threshold, no fallback), as the reference"""
+    edges = []
+    edge_weights = []
+    for i in range(len(stocks)):
+        for j in range(i + 1, len(stocks)):
+            corr = corr_matrix.iloc[i, j]
+            if abs(corr) > 0.1:
+                edges.extend([[i, j], [j, i]])
+                edge_weights.extend([corr, corr])
+    return _tensors(edges, edge_weights)
+
+def _tensors(edges, edge_weights):
+    edge_index = torch.tensor(edges, dtype=torch.long).t().contiguous() if edges else torch.empty(2, 0, dtype=torch.long)
+    edge_attr = torch.tensor(edge_weights, dtype=torch.float32) if edge_weights else torch.empty(0, dtype=torch.float32)
+    return edge_index, edge_attr
+
+def synthetic_returns(n_bars, n_stocks, factor=1.0, seed=0):
+    """One-factor daily returns; factor scales the shared component, so 0 gives (nearly) no edges"""
+    rng = np.random.default_rng(seed)
+    returns = factor * rng.normal(0, 0.01, (n_bars, 1)) + rng.normal(0, 0.015, (n_bars, n_stocks))
+    return pd.DataFrame(returns, columns=[f"S{i:04d}" for i in range(n_stocks)])
+
+def equivalence_cases():
+    """(name, returns) covering dense, sparse, fallback, zero-variance and tiny graphs"""
+    for n_stocks in (1, 2, 3, 12, 40):
+        for n_bars in (2, 5, 21):
+            for factor in (0.0, 1.0, 3.0):
+                yield f"{n_stocks} stocks x {n_bars} bars, factor {factor}", \
+                    synthetic_returns(n_bars, n_stocks, factor, seed=n_stocks * 100 + n_bars)
+
+    returns = synthetic_returns(21, 12, seed=7)
+    returns.iloc[:, [2, 5]] = 0.0
+    yield "zero-variance columns", returns
+
+    returns = synthetic_returns(21, 12, seed=8)
+    returns.iloc[3, 4] = np.nan
+    yield "NaN return", returns
+
+def _same(expected, actual):
+    (expected_index, expected_attr), (actual_index, actual_attr) = expected, actual
+    return torch.equal(expected_index, actual_index) and torch.allclose(expected_attr, actual_attr, rtol=0, atol=1e-6)
+
+def check_equivalence():
+    """Number of cases where both builders match their loops; raises SystemExit on the first mismatch"""
+    checked = 0
+    for name, returns in equivalence_cases():
+        stocks = list(returns.columns)
+        expected_graph, expected_corr = loop_inference_graph(stocks, returns)
+        graph, corr = build_correlation_graph(stocks, returns)
+        if not _same(expected_graph, (graph.edge_index, graph.edge_attr)) or \
+                not np.allclose(expected_corr.to_numpy(), corr.to_numpy(), rtol=0, atol=1e-12):
+            raise SystemExit(f"Inference graph differs from the loop for {name}")
+
+        if not _same(loop_validation_graph(expected_corr, stocks), build_edges(correlation_matrix(returns), threshold=0.1)):
+            raise SystemExit(f"Validation graph differs from the loop for {name}")
+        checked += 1
+    return checked
+
+def benchmark(function, repeats):
+    """Median seconds per call"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main(args):
+    logger.info(f"Vectorized builders match both loops on all {check_equivalence()} cases")
+
+    for n_stocks in args.stocks:
+        returns = synthetic_returns(args.bars, n_stocks)
+        stocks = list(returns.columns)
+        vectorized_s = benchmark(lambda: build_correlation_graph(stocks, returns), args.repeats)
+        top_k_s = benchmark(lambda: build_correlation_graph(stocks, returns, top_k=args.top_k), args.repeats)
+        line = (f"  {n_stocks} stocks x {args.bars} bars: vectorized {vectorized_s * 1000:.2f}ms, "
+                f"top_k={args.top_k} {top_k_s * 1000:.2f}ms")
+        if n_stocks <= args.loop_max_stocks:
+            loop_s = benchmark(lambda: loop_inference_graph(stocks, returns), 1)
+            line += f", loop {loop_s * 1000:.1f}ms ({loop_s / vectorized_s:.0f}x)"
+        logger.info(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the vectorized correlation-graph builder against the "
+                                                 "inference and validation loops and benchmark it")
+    parser.add_argument("--stocks", type=int, nargs="+", default=[12, 50, 200, 1000])
+    parser.add_argument("--bars", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--loop-max-stocks", type=int, default=200, help="skip the O(N^2) loop above this size")
+    main(parser.parse_args())
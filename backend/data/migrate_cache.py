@@ -0,0 +1,38 @@
+import os
+import glob
+import logging
+import argparse
+from config.settings import Config
+from data.cache_utils import CACHE_EXT, save_to_cache, load_legacy_pickle
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_pickle_cache(cache_dir=str(Config.cache_dir), delete=False):
+    """ONE-TIME: Convert legacy .pkl cache entries to the memory-mappable bar format"""
+    converted = 0
+    for pickle_file in sorted(glob.glob(os.path.join(cache_dir, "*.pkl"))):
+        cache_key = f"{os.path.basename(pickle_file)[:-len('.pkl')]}.{CACHE_EXT}"
+        try:
+            data, timestamp = load_legacy_pickle(pickle_file)
+            save_to_cache(data, cache_key, cache_dir, timestamp=timestamp)
+        except Exception as e:
+            logger.error(f"Failed {pickle_file}: {e}")
+            continue
+
+        # Keep the download time so cache expiry behaves as before
+        mtime = os.path.getmtime(pickle_file)
+        os.utime(os.path.join(cache_dir, cache_key), (mtime, mtime))
+        if delete:
+            os.remove(pickle_file)
+        converted += 1
+
+    logger.info(f"Migrated {converted} cache files in {cache_dir}")
+    return converted
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert pickle stock cache to the bar format")
+    parser.add_argument("--cache-dir", default=str(Config.cache_dir))
+    parser.add_argument("--delete", action="store_true", help="remove the .pkl files after conversion")
+    args = parser.parse_args()
+    migrate_pickle_cache(args.cache_dir, args.delete)
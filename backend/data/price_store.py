@@ -0,0 +1,186 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import torch
+from config.settings import Config
+from data.cache_utils import get_cache_key, load_cache_arrays
+from data.correlation import UniverseCorrelation
+from data.feature_cache import FeatureCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PriceSnapshot:
+    """Immutable (dates x tickers) close matrices for every timeframe, built from one cache scan"""
+    def __init__(self, tickers, frames, signature):
+        self.tickers = list(tickers)
+        self.column = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.frames = frames
+        self.signature = signature
+        self.version = snapshot_version(signature)
+
+def snapshot_version(signature):
+    return hashlib.sha1(repr(signature).encode()).hexdigest()[:16]
+
+class PriceStore:
+    """Resident close-price store for the whole universe, answering portfolio subsets by indexing"""
+    def __init__(self, tickers, cache_dir=str(Config.cache_dir), cache_expiry_days=7, check_interval=60):
+        self.tickers = list(tickers)
+        self.cache_dir = cache_dir
+        self.cache_expiry_days = cache_expiry_days
+        self.check_interval = check_interval
+        self.feature_cache = FeatureCache(cache_dir)
+        self._snapshot = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Spawned DataLoader workers get a pickled copy: they reload the matrices themselves
+        # (the feature cache files are memory-mapped, not recomputed) instead of copying them
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_snapshot'] = None
+        state['_last_check'] = 0.0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self):
+        """Current snapshot, reloading first if the cache files changed on disk"""
+        if self.stale:
+            self._refresh()
+        return self._snapshot
+
+    @property
+    def stale(self):
+        """Whether the next `snapshot` access stats the cache files (and may reload), i.e. blocks"""
+        return self._snapshot is None or time.monotonic() - self._last_check > self.check_interval
+
+    @property
+    def current(self):
+        """Last loaded snapshot, without checking the cache files"""
+        return self._snapshot
+
+    def reload(self):
+        """Rebuild all matrices from the cache files and swap them in atomically"""
+        with self._lock:
+            self._snapshot = self._load(self._signature())
+            self._last_check = time.monotonic()
+        return self._snapshot
+
+    def get_prices(self, stocks, timeframe):
+        """Close prices for a portfolio subset as a (dates x stocks) frame"""
+        snapshot = self.snapshot
+        frame = snapshot.frames[timeframe]
+        columns = self._columns(snapshot, frame, stocks)
+        return pd.DataFrame(frame['close'][:, columns], index=frame['dates'], columns=stocks)
+
+    def get_features(self, stocks, timeframe, seq_len):
+        """(prices, returns, stocks x seq_len x 8 features) for the last seq_len bars, gathered from
+        the universe feature cache, or None when a stock has gaps in the window (or is repeated)
+        and the portfolio needs its own dropna alignment, or the cache could not be built"""
+        snapshot = self.snapshot
+        frame = snapshot.frames[timeframe]
+        columns = self._columns(snapshot, frame, stocks)
+        if frame['features'] is None:
+            return None
+        if len(set(stocks)) != len(stocks) or not frame['correlation'].complete[columns].all():
+            return None
+
+        window = frame['close'][-seq_len:, columns]
+        dates = frame['dates'][-seq_len:]
+        prices = pd.DataFrame(window, index=dates, columns=stocks)
+        # Same arithmetic as pct_change().dropna() on a window without gaps
+        returns = pd.DataFrame(window[1:] / window[:-1] - 1, index=dates[1:], columns=stocks)
+        return prices, returns, torch.from_numpy(frame['features'][columns])
+
+    def get_correlation(self, stocks, timeframe):
+        """(corr, cov) submatrices of the precomputed universe matrices, or None if they don't apply"""
+        snapshot = self.snapshot
+        columns = [snapshot.column[stock] for stock in stocks]
+        return snapshot.frames[timeframe]['correlation'].submatrices(columns)
+
+    def _columns(self, snapshot, frame, stocks):
+        missing = [stock for stock in stocks if stock not in snapshot.column]
+        if missing:
+            raise Exception(f"Data missing for {missing[0]}. Run download_all_data_once() first!")
+
+        columns = np.fromiter((snapshot.column[stock] for stock in stocks), dtype=np.intp, count=len(stocks))
+        expired = frame['mtimes'][columns] < time.time() - self.cache_expiry_days * 86400
+        if expired.any():
+            raise Exception(f"Data missing for {stocks[int(np.argmax(expired))]}. Run download_all_data_once() first!")
+        return columns
+
+    def _refresh(self):
+        with self._lock:
+            self._last_check = time.monotonic()
+            signature = self._signature()
+            if self._snapshot is not None and signature == self._snapshot.signature:
+                return
+            logger.info("Loading price store from cache...")
+            self._snapshot = self._load(signature)
+
+    def _cache_file(self, ticker, period, interval):
+        return os.path.join(self.cache_dir, get_cache_key([ticker], period, interval))
+
+    def _signature(self):
+        """Modification times of every cache file backing the store"""
+        signature = []
+        for period, interval, _ in Config.timeframes.values():
+            for ticker in self.tickers:
+                try:
+                    signature.append(os.stat(self._cache_file(ticker, period, interval)).st_mtime_ns)
+                except FileNotFoundError:
+                    signature.append(None)
+        return tuple(signature)
+
+    def _load(self, signature):
+        version = snapshot_version(signature)
+        frames = {}
+        for timeframe, (period, interval, seq_len) in Config.timeframes.items():
+            series = {}
+            mtimes = np.full(len(self.tickers), -np.inf)
+            for col, ticker in enumerate(self.tickers):
+                cache_file = self._cache_file(ticker, period, interval)
+                if not os.path.exists(cache_file):
+                    continue
+                try:
+                    _, dates, columns = load_cache_arrays(os.path.basename(cache_file), self.cache_dir)
+                    close = next(values for key, values in columns.items() if key[0] == 'Close')
+                    series[col] = pd.Series(close, index=pd.DatetimeIndex(np.asarray(dates)))
+                    mtimes[col] = os.path.getmtime(cache_file)
+                except Exception as e:
+                    logger.error(f"Failed to load {ticker} ({timeframe}): {e}")
+
+            dates = pd.DatetimeIndex([])
+            for values in series.values():
+                dates = dates.union(values.index)
+
+            close = np.full((len(dates), len(self.tickers)), np.nan)
+            for col, values in series.items():
+                close[dates.get_indexer(values.index), col] = values.to_numpy(dtype=np.float64)
+
+            try:
+                features = self.feature_cache.load(version, timeframe, close, seq_len)
+            except Exception as e:
+                # Portfolios still get features from process_timeframe_data, just not from the cache
+                logger.error(f"Failed to build universe features ({timeframe}), using per-portfolio features: {e}")
+                features = None
+
+            frames[timeframe] = {
+                'dates': dates,
+                'close': close,
+                'mtimes': mtimes,
+                'correlation': UniverseCorrelation(close, seq_len),
+                'features': features
+            }
+
+        self.feature_cache.prune(version)
+        return PriceSnapshot(self.tickers, frames, signature)
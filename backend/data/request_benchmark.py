@@ -0,0 +1,83 @@
+import time
+import logging
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from data.core import StockData
+from data.features import process_timeframe_data
+from data.fixtures import write_synthetic_history
+from data.sources import CSVPriceSource
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class FakePriceSource(CSVPriceSource):
+    """Local CSV bars behind a simulated network round-trip, counting every fetch"""
+    def __init__(self, root, latency_ms=0.0):
+        super().__init__(root)
+        self.latency = latency_ms / 1000
+        self.fetches = 0
+
+    def fetch_daily(self, ticker, period=None, start=None, end=None):
+        self.fetches += 1
+        time.sleep(self.latency)
+        return super().fetch_daily(ticker, period=period, start=start, end=end)
+
+def download_close(source, stocks, period='1mo'):
+    """The yf.download(user_stocks, period='1mo') build_correlation_graph made, against the fake source"""
+    # One batched download is one round-trip, not one per ticker
+    time.sleep(source.latency)
+    frames = [CSVPriceSource.fetch_daily(source, stock, period=period) for stock in dict.fromkeys(stocks)]
+    source.fetches += 1
+    return pd.concat(frames, axis=1)['Close']
+
+def request_before(stock_data, source, stocks):
+    """A request as it ran before: cached timeframes plus the download-and-recompute of graph node features"""
+    data = stock_data.get_multi_timeframe_data(stocks)
+    data['graph'].x = process_timeframe_data(download_close(source, stocks), stocks, 30)['features']
+    return data
+
+def request_after(stock_data, source, stocks):
+    return stock_data.get_multi_timeframe_data(stocks)
+
+def latencies(request, stock_data, source, portfolios):
+    """Per-request milliseconds and the number of fetches the requests made"""
+    fetches = source.fetches
+    timings = []
+    for stocks in portfolios:
+        start = time.perf_counter()
+        request(stock_data, source, stocks)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings), source.fetches - fetches
+
+def main(args):
+    with tempfile.TemporaryDirectory() as root:
+        fixture_dir, cache_dir = f"{root}/prices", f"{root}/cache"
+        today = pd.Timestamp.today().normalize()
+        write_synthetic_history(fixture_dir, start=today - pd.DateOffset(years=1), end=today + pd.DateOffset(days=1))
+
+        source = FakePriceSource(fixture_dir, args.latency_ms)
+        stock_data = StockData(cache_dir=cache_dir, price_source=source)
+        stock_data.download_all_data_once()
+
+        rng = np.random.default_rng(args.seed)
+        portfolios = [rng.choice(stock_data.stock_universe, size=args.size, replace=False).tolist()
+                      for _ in range(args.requests)]
+        request_after(stock_data, source, portfolios[0])
+
+        for name, request in (('before (download in graph build)', request_before), ('after (cache only)', request_after)):
+            timings, fetches = latencies(request, stock_data, source, portfolios)
+            logger.info(f"  {name}: p50 {np.percentile(timings, 50):.1f}ms, p99 {np.percentile(timings, 99):.1f}ms "
+                        f"per {args.size}-stock request; {fetches} provider calls over {args.requests} requests")
+            if request is request_after and fetches:
+                raise SystemExit(f"Requests made {fetches} provider calls; graph construction should do no I/O")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request latency of get_multi_timeframe_data with and without "
+                                                 "the graph builder's download, against a local fake price provider")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--size", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="simulated provider round-trip")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
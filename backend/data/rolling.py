@@ -0,0 +1,154 @@
+import numpy as np
+from collections import deque
+
+class RollingMoments:
+    """Per-column sum and sum of squares over the last `length` rows, updated in O(N) per row.
+
+    Sums are kept around a per-column shift (the window mean at the last rebuild) so the
+    variance of e.g. a near-flat price level does not cancel catastrophically, and are
+    rebuilt from the retained rows every `resync` updates so drift stays bounded.
+    """
+    def __init__(self, length, n_columns, resync=1000):
+        self.length = length
+        self.resync = resync
+        self.rows = deque(maxlen=length)
+        self.sum = np.zeros(n_columns)
+        self.sumsq = np.zeros(n_columns)
+        self.shift = None
+        self._updates = 0
+
+    @property
+    def full(self):
+        return len(self.rows) == self.length
+
+    def update(self, row):
+        if self.shift is None:
+            self.shift = np.array(row, dtype=np.float64)
+        if self.full:
+            oldest = self.rows[0] - self.shift
+            self.sum -= oldest
+            self.sumsq -= oldest * oldest
+        self.rows.append(row)
+        centered = row - self.shift
+        self.sum += centered
+        self.sumsq += centered * centered
+
+        self._updates += 1
+        if self._updates % self.resync == 0:
+            window = np.array(self.rows)
+            self.shift = window.mean(axis=0)
+            centered = window - self.shift
+            self.sum = centered.sum(axis=0)
+            self.sumsq = (centered * centered).sum(axis=0)
+        return self
+
+    @property
+    def mean(self):
+        return self.shift + self.sum / len(self.rows)
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1)"""
+        count = len(self.rows)
+        variance = (self.sumsq - self.sum * self.sum / count) / (count - 1)
+        return np.sqrt(np.maximum(variance, 0.0))
+
+class RollingCorrelation:
+    """Pearson correlation of the last `length` return rows, updated in O(N^2) per row"""
+    def __init__(self, length, n_assets, resync=1000):
+        self.length = length
+        self.resync = resync
+        self.rows = deque(maxlen=length)
+        self.sum = np.zeros(n_assets)
+        self.cross = np.zeros((n_assets, n_assets))
+        self._updates = 0
+
+    def update(self, row):
+        if len(self.rows) == self.length:
+            oldest = self.rows[0]
+            self.sum -= oldest
+            self.cross -= np.outer(oldest, oldest)
+        self.rows.append(row)
+        self.sum += row
+        self.cross += np.outer(row, row)
+
+        self._updates += 1
+        if self._updates % self.resync == 0:
+            window = np.array(self.rows)
+            self.sum = window.sum(axis=0)
+            self.cross = window.T @ window
+        return self
+
+    @property
+    def corr(self):
+        """Correlation matrix with undefined entries (zero variance) set to 0 like correlation_matrix"""
+        count = len(self.rows)
+        scatter = self.cross - np.outer(self.sum, self.sum) / count
+        norms = np.sqrt(np.maximum(np.diag(scatter), 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = scatter / np.outer(norms, norms)
+        return np.nan_to_num(corr, nan=0.0, posinf=0.0, neginf=0.0)
+
+class RollingSnapshotFeatures:
+    """compute_snapshot_features and the return correlation of a trailing price window, for every
+    asset, advanced one bar at a time instead of recomputed per date.
+
+    After update(prices at bar t) the state describes the window of the last `window` bars
+    ending at t, the same window validate_on_date builds for the day after t.
+    """
+    def __init__(self, n_assets, window=30, bollinger=20, rsi_period=14, resync=1000):
+        self.window = window
+        self.prices = deque(maxlen=bollinger + 1)
+        self.bars = 0
+        self.last_return = np.zeros(n_assets)
+        self.returns_5 = RollingMoments(5, n_assets, resync)
+        self.returns_20 = RollingMoments(bollinger, n_assets, resync)
+        self.gains = RollingMoments(rsi_period, n_assets, resync)
+        self.losses = RollingMoments(rsi_period, n_assets, resync)
+        # Counted separately so "no losses in the window" is exact rather than a drifting sum
+        self.loss_days = RollingMoments(rsi_period, n_assets, resync)
+        self.prices_20 = RollingMoments(bollinger, n_assets, resync)
+        self.correlation = RollingCorrelation(window - 1, n_assets, resync)
+
+    @property
+    def ready(self):
+        return self.bars >= self.window
+
+    def update(self, prices):
+        prices = np.asarray(prices, dtype=np.float64)
+        if self.prices:
+            previous = self.prices[-1]
+            self.last_return = prices / previous - 1
+            deltas = prices - previous
+            self.returns_5.update(self.last_return)
+            self.returns_20.update(self.last_return)
+            self.gains.update(np.where(deltas > 0, deltas, 0.0))
+            self.losses.update(np.where(deltas < 0, -deltas, 0.0))
+            self.loss_days.update((deltas < 0).astype(np.float64))
+            self.correlation.update(self.last_return)
+        self.prices.append(prices)
+        self.prices_20.update(prices)
+        self.bars += 1
+        return self
+
+    def features(self):
+        """(N x 8) normalized features, matching compute_snapshot_features on the current window"""
+        latest = self.prices[-1]
+        momentum_5 = latest / self.prices[-6] - 1
+        momentum_10 = latest / self.prices[-11] - 1
+        momentum_20 = latest / self.prices[-21] - 1
+
+        avg_gain, avg_loss = self.gains.mean, self.losses.mean
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(self.loss_days.mean < 0.5 / self.loss_days.length, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+
+        rolling_mean, rolling_std = self.prices_20.mean, self.prices_20.std
+        # A flat window has std exactly 0 when recomputed; the running sums only get close
+        rolling_std = np.where(rolling_std <= 1e-9 * np.abs(rolling_mean), 0.0, rolling_std)
+        band_width = 4 * rolling_std
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb_position = np.where(band_width == 0, 0.5, (latest - (rolling_mean - 2 * rolling_std)) / band_width)
+
+        features = np.stack([momentum_5, momentum_10, momentum_20, self.returns_5.std, self.returns_20.std,
+                             rsi, bb_position, self.last_return], axis=-1)
+        return (features - features.mean(axis=-1, keepdims=True)) / (features.std(axis=-1, keepdims=True) + 1e-8)
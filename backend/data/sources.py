@@ -0,0 +1,51 @@
+import os
+import pandas as pd
+import yfinance as yf
+
+PRICE_FIELDS = ['Close', 'High', 'Low', 'Open', 'Volume']
+
+class PriceSource:
+    """Provider of adjusted daily OHLCV bars for one ticker at a time"""
+    def fetch_daily(self, ticker, period=None, start=None, end=None):
+        """Return a yfinance-shaped frame: Date index, (Price, Ticker) columns"""
+        raise NotImplementedError
+
+class YahooPriceSource(PriceSource):
+    """Live Yahoo Finance bars; uses Ticker.history, which is safe to call from worker threads"""
+    def fetch_daily(self, ticker, period=None, start=None, end=None):
+        window = {key: value for key, value in (('period', period), ('start', start), ('end', end)) if value is not None}
+        history = yf.Ticker(ticker).history(interval='1d', auto_adjust=True, raise_errors=True, **window)
+        if history.empty:
+            raise ValueError(f"No price data returned for {ticker}")
+        if history.index.tz is not None:
+            history.index = history.index.tz_localize(None)
+        history.index.name = 'Date'
+        return to_price_frame(history, ticker)
+
+class CSVPriceSource(PriceSource):
+    """Offline bars from <root>/<TICKER>.csv files with Date, Open, High, Low, Close, Volume columns"""
+    def __init__(self, root):
+        self.root = root
+
+    def fetch_daily(self, ticker, period=None, start=None, end=None):
+        history = pd.read_csv(os.path.join(self.root, f"{ticker}.csv"), index_col='Date', parse_dates=True)
+        history = history.sort_index()
+        if start is not None:
+            history = history[history.index >= pd.Timestamp(start)]
+        if end is not None:
+            history = history[history.index < pd.Timestamp(end)]
+        if period is not None:
+            history = history[history.index >= period_start(history.index[-1], period)]
+        return to_price_frame(history, ticker)
+
+def to_price_frame(history, ticker):
+    """Reshape flat OHLCV columns into the (Price, Ticker) layout yf.download produces"""
+    frame = history[PRICE_FIELDS].copy()
+    frame.columns = pd.MultiIndex.from_product([PRICE_FIELDS, [ticker]], names=['Price', 'Ticker'])
+    return frame
+
+def period_start(last_date, period):
+    """First date covered by a yfinance-style period string ('5d', '1mo', '6mo', '1y') ending at last_date"""
+    count, unit = int(period.rstrip('dmoy')), period.lstrip('0123456789')
+    offset = {'d': pd.DateOffset(days=count), 'mo': pd.DateOffset(months=count), 'y': pd.DateOffset(years=count)}[unit]
+    return pd.Timestamp(last_date).normalize() - offset
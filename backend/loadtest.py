@@ -0,0 +1,134 @@
+import time
+import asyncio
+import logging
+import argparse
+import httpx
+import numpy as np
+from router import app
+from api.encoding import NDJSON, PACKED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACCEPT = {'json': 'application/json', 'ndjson': NDJSON, 'packed': PACKED}
+
+def random_scenario(stocks, rng, max_size=12):
+    portfolio = rng.choice(stocks, size=int(rng.integers(2, max_size + 1)), replace=False).tolist()
+    return {
+        'portfolio': [{'stock': stock, 'shares': int(rng.integers(1, 100))} for stock in portfolio],
+        'shocks': [{'stock': portfolio[0], 'change_percent': float(rng.uniform(-20, 20))}]
+    }
+
+async def drive(client, path, payloads, concurrency, headers=None):
+    """POST every payload with at most `concurrency` requests in flight; returns latencies and statuses"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], []
+
+    async def call(payload):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json=payload, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses.append(response.status_code)
+
+    await asyncio.gather(*(call(payload) for payload in payloads))
+    return np.array(latencies) * 1000, statuses
+
+async def probe(client, path, stop, interval=0.02):
+    """GET `path` on a fixed schedule until stop is set; returns latencies in ms.
+
+    Latency counts from the scheduled send time, so time the probe spent waiting for a
+    blocked event loop is included rather than silently skipped.
+    """
+    latencies = []
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        await client.get(path)
+        latencies.append(time.perf_counter() - scheduled)
+        scheduled = max(scheduled + interval, time.perf_counter())
+        await asyncio.sleep(scheduled - time.perf_counter())
+    return np.array(latencies) * 1000
+
+def _without_timestamp(result):
+    return {key: value for key, value in result.items() if key != 'analysis_timestamp'}
+
+async def compare_batch(client, ctx, payloads, batch_size):
+    """Portfolios/s looping over /analyze one request at a time vs /analyze/batch in chunks of
+    batch_size; both start from empty caches and must return the same results"""
+    throughput, results = {}, {}
+    for mode in ('loop', 'batch'):
+        ctx.result_cache.clear()
+        ctx.prediction_cache.clear()
+        results[mode] = []
+        start = time.perf_counter()
+        if mode == 'loop':
+            for payload in payloads:
+                response = await client.post("/analyze", json=payload)
+                response.raise_for_status()
+                results[mode].append(response.json())
+        else:
+            for offset in range(0, len(payloads), batch_size):
+                response = await client.post("/analyze/batch", json=payloads[offset:offset + batch_size])
+                response.raise_for_status()
+                results[mode] += response.json()['results']
+        throughput[mode] = len(payloads) / (time.perf_counter() - start)
+
+    mismatched = sum(_without_timestamp(single) != _without_timestamp(batched)
+                     for single, batched in zip(results['loop'], results['batch']))
+    logger.info(f"{len(payloads)} portfolios: looping /analyze {throughput['loop']:.1f} portfolios/s, "
+                f"/analyze/batch (batch {batch_size}) {throughput['batch']:.1f} portfolios/s "
+                f"({throughput['batch'] / throughput['loop']:.2f}x)")
+    if mismatched:
+        raise SystemExit(f"{mismatched} batch results differ from /analyze")
+
+async def main(args):
+    ctx = app.state.ctx
+    if args.ignore_expiry:
+        ctx.stock_data.price_store.cache_expiry_days = float('inf')
+
+    rng = np.random.default_rng(args.seed)
+    payloads = [random_scenario(ctx.all_stocks, rng) for _ in range(args.requests)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        if args.mode == 'batch':
+            await compare_batch(client, ctx, payloads, args.batch_size)
+            return
+
+        stop = asyncio.Event()
+        idle_probe = asyncio.create_task(probe(client, "/health", stop))
+        await asyncio.sleep(1)
+        stop.set()
+        idle_health = await idle_probe
+
+        stop = asyncio.Event()
+        loaded_probe = asyncio.create_task(probe(client, "/health", stop))
+        start = time.perf_counter()
+        latencies, statuses = await drive(client, "/analyze", payloads, args.concurrency,
+                                          headers={'accept': ACCEPT[args.accept]})
+        elapsed = time.perf_counter() - start
+        stop.set()
+        loaded_health = await loaded_probe
+
+    ok = sum(status == 200 for status in statuses)
+    rejected = sum(status == 429 for status in statuses)
+    logger.info(f"/analyze ({args.accept}): {len(statuses)} requests, {ok} ok, {rejected} rejected, "
+                f"concurrency {args.concurrency}")
+    logger.info(f"  p50 {np.percentile(latencies, 50):.1f}ms  p99 {np.percentile(latencies, 99):.1f}ms  "
+                f"throughput {len(statuses) / elapsed:.1f} req/s")
+    logger.info(f"  scheduler: {ctx.scheduler.stats()}")
+    logger.info(f"  stages: {ctx.analysis_pool.stats()['stages']}")
+    for label, health in (("idle", idle_health), ("under load", loaded_health)):
+        logger.info(f"/health {label}: p50 {np.percentile(health, 50):.2f}ms  p99 {np.percentile(health, 99):.2f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process load test for the analysis API")
+    parser.add_argument("--mode", choices=['load', 'batch'], default='load',
+                        help="'load' drives /analyze concurrently; 'batch' compares /analyze/batch with looping /analyze")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=50, help="portfolios per /analyze/batch call in batch mode")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--accept", choices=sorted(ACCEPT), default="json", help="response format to request")
+    parser.add_argument("--ignore-expiry", action="store_true", help="serve from the cache even if it is stale")
+    asyncio.run(main(parser.parse_args()))
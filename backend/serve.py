@@ -0,0 +1,127 @@
+import gc
+import os
+import time
+import signal
+import socket
+import logging
+import argparse
+import importlib
+import uvicorn
+from config.settings import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def load_app(app_path):
+    """The ASGI app named by "module:attribute", as for uvicorn"""
+    module, attribute = app_path.split(":")
+    return getattr(importlib.import_module(module), attribute)
+
+def memory_kb(pid="self"):
+    """(Rss, Pss, private) KB of a process; Pss splits shared pages between the processes mapping them"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Rss"], fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+def run_worker(app, sock, args, forked_at):
+    """Serve the preloaded app on the inherited socket; SIGUSR1 re-maps the current shared checkpoint"""
+    for signum in (signal.SIGHUP, signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+
+    ctx = app.state.ctx
+    def reload(signum, frame):
+        ctx.reload_model()
+        logger.info(f"Worker {os.getpid()} now serving model {ctx.model_hash}")
+    signal.signal(signal.SIGUSR1, reload)
+
+    rss, pss, private = memory_kb()
+    logger.info(f"Worker {os.getpid()} ready in {(time.perf_counter() - forked_at) * 1000:.1f}ms "
+                f"(RSS {rss / 1024:.0f}MB, PSS {pss / 1024:.0f}MB, private {private / 1024:.1f}MB)")
+    server = uvicorn.Server(uvicorn.Config(app, log_level=args.log_level))
+    server.run(sockets=[sock])
+
+def main(args):
+    # Publish before the app is imported so its AppContext maps the shared file
+    Config.shared_weights = True
+    from api.shared_weights import SharedWeights
+    shared_weights = SharedWeights()
+    shared_weights.publish(args.model)
+
+    start = time.perf_counter()
+    app = load_app(args.app)
+    # Build the price store's matrices once; forked workers share them copy-on-write
+    app.state.ctx.stock_data.price_store.snapshot
+    logger.info(f"Loaded app, model and price store in {time.perf_counter() - start:.2f}s")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Keep the collector from writing to (and so un-sharing) the pages of preloaded objects
+    gc.freeze()
+
+    workers = set()
+    def spawn():
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args, forked_at)
+            finally:
+                os._exit(0)
+        workers.add(pid)
+
+    pending = []
+    signal.signal(signal.SIGHUP, lambda signum, frame: pending.append('reload'))
+    signal.signal(signal.SIGINT, lambda signum, frame: pending.append('stop'))
+    signal.signal(signal.SIGTERM, lambda signum, frame: pending.append('stop'))
+
+    for _ in range(args.workers):
+        spawn()
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers (master {os.getpid()}); "
+                f"SIGHUP reloads {args.model}")
+
+    while 'stop' not in pending:
+        if 'reload' in pending:
+            pending.remove('reload')
+            try:
+                shared_weights.publish(args.model)
+                # Replacement workers fork from the master, so it maps the new checkpoint too
+                app.state.ctx.reload_model()
+                for pid in workers:
+                    os.kill(pid, signal.SIGUSR1)
+            except Exception as e:
+                logger.error(f"Reload failed, workers keep the current model: {e}")
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid in workers:
+            workers.discard(pid)
+            logger.warning(f"Worker {pid} exited ({status}), starting a replacement")
+            spawn()
+        time.sleep(0.2)
+
+    for pid in workers:
+        os.kill(pid, signal.SIGTERM)
+    for pid in workers:
+        os.waitpid(pid, 0)
+    logger.info("All workers stopped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-fork server: the model and price store are loaded once "
+                                                 "and shared by every worker")
+    parser.add_argument("--app", default="router:app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", default=str(Config.model_dir / "temporal_gnn_2.pt"))
+    parser.add_argument("--log-level", default="warning")
+    main(parser.parse_args())
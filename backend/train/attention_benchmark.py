@@ -0,0 +1,77 @@
+import logging
+import argparse
+import torch
+from config.settings import Config
+from train.export import load_model, sample_inputs, benchmark
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def attention_timings(model, n_nodes, n_graphs=1, repeats=200):
+    """Median ms per forward of the first attention layer and of the whole model, sparse vs dense"""
+    short_features, medium_features, long_features, edge_index, edge_attr = inputs = sample_inputs(n_nodes, n_graphs)
+    with torch.no_grad():
+        hidden = model.temporal_encoder(short_features, medium_features, long_features)
+
+    timings = {}
+    for mode, max_nodes in (('sparse', 0), ('dense', hidden.size(0))):
+        model.set_dense_max_nodes(max_nodes)
+        timings[mode] = (
+            benchmark(model.gnn1, (hidden, edge_index, edge_attr), repeats),
+            benchmark(model, inputs, repeats // 4)
+        )
+    model.set_dense_max_nodes(Config.dense_attention_max_nodes)
+    return timings, edge_index.size(1)
+
+def sparse_and_dense(model, inputs):
+    """(outputs, parameter gradients of their sum) with the sparse path forced, then the dense one"""
+    results = []
+    for max_nodes in (0, inputs[0].size(0)):
+        model.set_dense_max_nodes(max_nodes)
+        model.zero_grad()
+        impact, uncertainty = model(*inputs)
+        (impact.sum() + uncertainty.sum()).backward()
+        results.append(([impact.detach(), uncertainty.detach()],
+                        [param.grad.clone() for param in model.parameters() if param.grad is not None]))
+    model.set_dense_max_nodes(Config.dense_attention_max_nodes)
+    model.zero_grad()
+    return results
+
+def check_equivalence(model, sizes=((1, 1), (2, 1), (4, 1), (12, 1), (50, 1), (12, 8), (50, 8), (100, 6))):
+    """Largest difference between the sparse and dense paths, over outputs and parameter gradients,
+    on (n_nodes, n_graphs) sample batches with the same weights (relative where a tensor exceeds 1)"""
+    worst = 0.0
+    for n_nodes, n_graphs in sizes:
+        (sparse_outputs, sparse_grads), (dense_outputs, dense_grads) = sparse_and_dense(
+            model, sample_inputs(n_nodes, n_graphs, seed=n_nodes * 100 + n_graphs))
+        if len(sparse_grads) != len(dense_grads):
+            raise SystemExit(f"{n_graphs} x {n_nodes} nodes: sparse and dense paths train different parameters")
+        # Gradients of the summed loss grow with the batch, so scale each difference by its tensor's size
+        difference = max(((a - b).abs().max() / a.abs().max().clamp(min=1.0)).item()
+                         for a, b in zip(sparse_outputs + sparse_grads, dense_outputs + dense_grads))
+        logger.info(f"  {n_graphs} x {n_nodes} nodes: max |sparse - dense| {difference:.2e}")
+        worst = max(worst, difference)
+    return worst
+
+def main(args):
+    model = load_model(args.model, 'eager', 'fp32')
+    worst = check_equivalence(model)
+    if worst > args.tolerance:
+        raise SystemExit(f"Dense attention differs from the sparse path: {worst:.2e} > {args.tolerance:.0e}")
+    logger.info(f"Dense and sparse attention agree within {worst:.2e} (outputs and gradients)")
+
+    for n_nodes, n_graphs in [(4, 1), (8, 1), (12, 1), (25, 1), (50, 1), (12, 8), (100, 1), (12, 16),
+                              (200, 1), (12, 32), (400, 1), (12, 64)]:
+        timings, n_edges = attention_timings(model, n_nodes, n_graphs, args.repeats)
+        (sparse_layer, sparse_model), (dense_layer, dense_model) = timings['sparse'], timings['dense']
+        logger.info(f"  {n_graphs} x {n_nodes} nodes ({n_edges} edges): layer sparse {sparse_layer:.3f}ms, "
+                    f"dense {dense_layer:.3f}ms ({sparse_layer / dense_layer:.2f}x); "
+                    f"model sparse {sparse_model:.2f}ms, dense {dense_model:.2f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check dense AttentionGraphSAGE against the sparse path, then "
+                                                 "benchmark their crossover by node count")
+    parser.add_argument("--model", default=str(Config.model_dir / "temporal_gnn_2.pt"))
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    main(parser.parse_args())
@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+import argparse
+import torch
+import numpy as np
+import pandas as pd
+from torch_geometric.data import Data
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from config.settings import Config
+from data.batching import predict_batch
+from data.cache_utils import load_cache_arrays
+from data.download import history_cache_key, fetch_with_retry
+from data.features import pct_returns
+from data.sources import CSVPriceSource
+from train.models import TemporalGNN
+from train.metrics import combined_accuracy
+from train.validation import snapshot_inputs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HistoryPanel:
+    """Daily closes of a set of tickers over the whole backtest range, loaded once and sliced per snapshot"""
+    def __init__(self, close):
+        self.close = close.sort_index()
+        self.index = self.close.index
+        self.values = self.close.to_numpy(dtype=np.float64)
+        self.column = {ticker: i for i, ticker in enumerate(self.close.columns)}
+
+    @classmethod
+    def from_cache(cls, tickers, cache_dir=str(Config.cache_dir)):
+        """Panel from the daily history files the incremental refresh keeps per ticker"""
+        series = {}
+        for ticker in tickers:
+            _, dates, columns = load_cache_arrays(history_cache_key(ticker), cache_dir)
+            close = next(values for key, values in columns.items() if key[0] == 'Close')
+            series[ticker] = pd.Series(np.array(close), index=pd.DatetimeIndex(np.asarray(dates)))
+        return cls(pd.DataFrame(series))
+
+    @classmethod
+    def from_source(cls, source, tickers, start, end=None, max_workers=Config.download_workers):
+        """Panel fetched with one request per ticker covering the whole range"""
+        def fetch(ticker):
+            bars = fetch_with_retry(source, ticker, start=start, end=end)
+            return bars[('Close', ticker)]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            closes = list(pool.map(fetch, tickers))
+        return cls(pd.DataFrame(dict(zip(tickers, closes))))
+
+    def covers(self, start, end):
+        return len(self.index) > 0 and self.index[0] <= pd.Timestamp(start) and self.index[-1] >= pd.Timestamp(end)
+
+    def snapshot(self, stocks, date, days_back=30):
+        """Same layout as data.historical.get_historical_snapshot, sliced from the resident panel.
+
+        Columns follow `stocks` (yf.download sorts them), so actual moves line up with the
+        model's nodes.
+        """
+        end_date = pd.Timestamp(date)
+        start_date = end_date - pd.Timedelta(days=days_back + 30)
+        lo, hi = self.index.searchsorted([start_date, end_date], side='left')
+
+        window = self.values[lo:hi, [self.column[stock] for stock in stocks]]
+        complete = ~np.isnan(window).any(axis=1)
+        prices = pd.DataFrame(window[complete], index=self.index[lo:hi][complete], columns=stocks)
+
+        returns = pct_returns(prices).reindex(prices.index)
+        return {
+            'prices': prices.iloc[-days_back:],
+            'actual_moves': returns.iloc[-days_back:],
+            'date': end_date
+        }
+
+def backtest_portfolio(model, panel, stocks, dates):
+    """Accuracy per date for one portfolio; every date's snapshot shares one batched forward pass
+    and all dates are scored together"""
+    inputs, actual = [], []
+    for date in dates:
+        try:
+            snapshot_data, actual_moves = snapshot_inputs(panel.snapshot(stocks, date), stocks)
+        except Exception as e:
+            logger.error(f"  Validation error on {date}: {e}")
+            snapshot_data, actual_moves = None, None
+        inputs.append(snapshot_data)
+        actual.append(actual_moves)
+
+    valid = [i for i, snapshot_data in enumerate(inputs) if snapshot_data is not None]
+    predictions = predict_batch(model, [_snapshot_graph(inputs[i]) for i in valid]) if valid else []
+
+    accuracies = [0.5] * len(dates)
+    if valid:
+        scores = combined_accuracy(np.stack([impacts_np for impacts_np, _ in predictions]),
+                                   np.stack([actual[i].to_numpy() for i in valid]))
+        for i, score in zip(valid, scores):
+            accuracies[i] = float(score)
+    return accuracies
+
+def run_backtest(model, panel, portfolios, dates, workers=Config.backtest_workers):
+    """Accuracies per portfolio (list of per-date lists), portfolios spread over worker processes"""
+    model.eval()
+    if workers <= 1 or len(portfolios) <= 1:
+        return [backtest_portfolio(model, panel, stocks, dates) for stocks in portfolios]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(portfolios)),
+                             initializer=_init_worker, initargs=(model, panel)) as pool:
+        return list(pool.map(_backtest_worker, [(stocks, dates) for stocks in portfolios]))
+
+def load_history(stock_data, tickers, start, end):
+    """Local daily histories when they cover [start, end], otherwise one fetch per ticker from the price source"""
+    try:
+        panel = HistoryPanel.from_cache(tickers, stock_data.cache_dir)
+        if panel.covers(start, end):
+            return panel
+    except Exception as e:
+        logger.info(f"Local history unavailable ({e}); fetching from the price source")
+    return HistoryPanel.from_source(stock_data.price_source, tickers, start, pd.Timestamp(end) + pd.Timedelta(days=1))
+
+def backtest_dates(end, days):
+    """Weekdays among the `days` calendar days ending at `end`"""
+    return [date for date in pd.date_range(end=end, periods=days, freq='D') if date.weekday() < 5]
+
+def _snapshot_graph(inputs):
+    """A snapshot's inputs in the portfolio data layout predict_batch collates"""
+    return {
+        'timeframes': {timeframe: {'features': inputs[timeframe]} for timeframe in ('short', 'medium', 'long')},
+        'graph': Data(edge_index=inputs['edge_index'], edge_attr=inputs['edge_attr'])
+    }
+
+_worker = {}
+
+def _init_worker(model, panel):
+    torch.set_num_threads(1)
+    _worker['model'] = model
+    _worker['panel'] = panel
+
+def _backtest_worker(args):
+    stocks, dates = args
+    return backtest_portfolio(_worker['model'], _worker['panel'], stocks, dates)
+
+def main(args):
+    model = TemporalGNN()
+    model.load_state_dict(torch.load(args.model, map_location='cpu'))
+
+    source = CSVPriceSource(args.csv_dir)
+    tickers = sorted(file[:-len('.csv')] for file in os.listdir(args.csv_dir) if file.endswith('.csv'))
+    panel = HistoryPanel.from_source(source, tickers, start=None)
+
+    rng = np.random.default_rng(args.seed)
+    portfolios = [rng.choice(tickers, size=args.size, replace=False).tolist() for _ in range(args.portfolios)]
+    dates = backtest_dates(pd.Timestamp(args.end) if args.end else panel.index[-1], args.days)
+
+    start = time.perf_counter()
+    results = run_backtest(model, panel, portfolios, dates, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for stocks, accuracies in zip(portfolios, results):
+        logger.info(f"  {stocks[:3]}...: {np.mean(accuracies):.1%} ± {np.std(accuracies):.1%}")
+    logger.info(f"Average accuracy {np.mean(results):.1%} over {len(portfolios)} portfolios x {len(dates)} dates "
+                f"in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline backtest against CSV daily bars (see data/fixtures.py)")
+    parser.add_argument("--csv-dir", required=True)
+    parser.add_argument("--model", default=str(Config.model_dir / "temporal_gnn_2.pt"))
+    parser.add_argument("--portfolios", type=int, default=5)
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--end", default=None, help="last backtest date (default: last date in the data)")
+    parser.add_argument("--workers", type=int, default=Config.backtest_workers)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
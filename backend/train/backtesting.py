@@ -1,7 +1,7 @@
 import logging
 import numpy as np
 import pandas as pd
-from train.validation import validate_on_date
+from train.backtest_engine import backtest_dates, load_history, run_backtest
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,25 +13,21 @@ def historical_backtesting(trainer, portfolio_size=15, days=20):
     # Test on multiple random portfolios over time
     all_accuracies = []
     portfolio_results = []
+    portfolios = [trainer.data_helper.sample_random_portfolio(portfolio_size) for _ in range(5)]
     
-    for portfolio_num in range(5):
-        stocks = trainer.data_helper.sample_random_portfolio(portfolio_size)
-        portfolio_accuracies = []
-        
+    # Test every portfolio across the same historical dates
+    test_dates = backtest_dates(pd.Timestamp.now() - pd.Timedelta(days=7), min(days, 30))
+    
+    # One history load for every ticker involved, then each snapshot is an array slice
+    results = [[] for _ in portfolios]
+    if test_dates:
+        tickers = sorted({stock for stocks in portfolios for stock in stocks})
+        panel = load_history(trainer.data_helper, tickers, test_dates[0] - pd.Timedelta(days=60), test_dates[-1])
+        results = run_backtest(trainer.model, panel, portfolios, test_dates)
+    
+    for portfolio_num, (stocks, portfolio_accuracies) in enumerate(zip(portfolios, results)):
         logger.info(f"  Portfolio {portfolio_num+1}: {stocks[:3]}...")
         
-        # Test this portfolio across multiple historical dates
-        test_dates = pd.date_range(
-            end=pd.Timestamp.now() - pd.Timedelta(days=7),
-            periods=min(days, 30),
-            freq='D'
-        )
-        
-        for test_date in test_dates[-days:]:
-            if test_date.weekday() < 5:
-                accuracy = validate_on_date(trainer, stocks, test_date)
-                portfolio_accuracies.append(accuracy)
-        
         if portfolio_accuracies:
             portfolio_avg = np.mean(portfolio_accuracies)
             portfolio_std = np.std(portfolio_accuracies)
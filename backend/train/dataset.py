@@ -0,0 +1,62 @@
+import torch
+import numpy as np
+from torch.utils.data import IterableDataset, DataLoader, get_worker_info
+from config.settings import Config
+from data.batching import collate_portfolios
+from train.loss import portfolio_targets
+
+class RandomPortfolioDataset(IterableDataset):
+    """`steps` minibatches of random portfolios, each ready for one forward/backward.
+
+    Step k is drawn from its own generator seeded with (seed, k), so the stream is the
+    same whatever the number of workers; worker w builds steps w, w + workers, ... and
+    the DataLoader hands them back in step order.
+    """
+    def __init__(self, stock_data, portfolio_size, batch_size, steps, seed=0):
+        self.stock_data = stock_data
+        self.portfolio_size = portfolio_size
+        self.batch_size = batch_size
+        self.steps = steps
+        self.seed = seed
+
+    def __len__(self):
+        return self.steps
+
+    def __iter__(self):
+        info = get_worker_info()
+        worker, workers = (info.id, info.num_workers) if info is not None else (0, 1)
+        for step in range(worker, self.steps, workers):
+            yield self.minibatch(np.random.default_rng([self.seed, step]))
+
+    def minibatch(self, rng):
+        """Collated batches plus next-day return targets in portfolio/node order"""
+        stocks_list = [
+            rng.choice(self.stock_data.stock_universe, size=self.portfolio_size, replace=False).tolist()
+            for _ in range(self.batch_size)
+        ]
+        data_list = [self.stock_data.get_multi_timeframe_data(stocks) for stocks in stocks_list]
+        return {
+            'stocks': stocks_list,
+            'batches': collate_portfolios(data_list),
+            'targets': torch.cat([portfolio_targets(data, stocks) for data, stocks in zip(data_list, stocks_list)])
+        }
+
+def portfolio_loader(stock_data, portfolio_size, batch_size, steps, seed=0,
+                     workers=Config.train_workers, prefetch=Config.train_prefetch):
+    """DataLoader building minibatches in worker processes, `prefetch` steps ahead per worker.
+
+    Workers hand tensors back through shared memory; with workers=0 minibatches are
+    built inline on the training thread.
+    """
+    dataset = RandomPortfolioDataset(stock_data, portfolio_size, batch_size, steps, seed)
+    return DataLoader(
+        dataset,
+        batch_size=None,
+        collate_fn=_as_is,
+        num_workers=workers,
+        prefetch_factor=prefetch if workers > 0 else None,
+        pin_memory=torch.cuda.is_available()
+    )
+
+def _as_is(item):
+    return item
@@ -0,0 +1,190 @@
+import time
+import logging
+import argparse
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import numpy as np
+from config.settings import Config
+from data.graph import build_edges
+from train.models import TemporalGNN, dense_attention, dense_edge_counts
+from train.quantize import ReducedPrecision, quantize_model
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ScatterAttention(nn.Module):
+    """AttentionGraphSAGE's forward as plain index/scatter ops, sharing the layer's weights.
+
+    Same math as the torch_geometric version: attention is a softmax over each edge's
+    source node (edge_index[0]) and the weighted source features are summed at its target.
+    """
+    def __init__(self, layer):
+        super().__init__()
+        self.lin = layer.lin
+        self.attention = layer.attention
+
+    def forward(self, x, row, col, edge_weights):
+        return self.attend(self.lin(x), row, col, edge_weights)
+
+    def attend(self, x, row, col, edge_weights):
+        x_i, x_j = x.index_select(0, row), x.index_select(0, col)
+        scores = self.attention(torch.cat([x_i, x_j, edge_weights], dim=-1)).squeeze(-1)
+
+        n_nodes = x.size(0)
+        maxes = scores.new_zeros(n_nodes).scatter_reduce(0, row, scores, reduce='amax', include_self=False)
+        exp = (scores - maxes.index_select(0, row)).exp()
+        sums = exp.new_zeros(n_nodes).index_add(0, row, exp) + 1e-16
+        weights = exp / sums.index_select(0, row)
+
+        messages = weights.unsqueeze(-1) * x_i
+        return x.new_zeros(n_nodes, x.size(1)).index_add(0, col, messages)
+
+class DenseScatterAttention(ScatterAttention):
+    """ScatterAttention that takes AttentionGraphSAGE's dense path on graphs up to the layer's
+    dense_max_nodes without repeated edges (float attention weights only)"""
+    def __init__(self, layer):
+        super().__init__(layer)
+        self.dense_max_nodes = layer.dense_max_nodes
+
+    def forward(self, x, row, col, edge_weights):
+        x = self.lin(x)
+        if x.size(0) <= self.dense_max_nodes:
+            counts = dense_edge_counts(x, row, col)
+            if bool(counts.max() <= 1):
+                return dense_attention(x, row, col, edge_weights, self.attention.weight[0], self.attention.bias, counts)
+        return self.attend(x, row, col, edge_weights)
+
+def _attention(layer):
+    if isinstance(layer.attention, nn.Linear):
+        return DenseScatterAttention(layer)
+    return ScatterAttention(layer)
+
+class ScriptableTemporalGNN(nn.Module):
+    """TemporalGNN with torch_geometric's propagate machinery replaced by ScatterAttention so the
+    whole forward compiles with TorchScript. Shares (does not copy) the eager model's parameters.
+    """
+    def __init__(self, model):
+        super().__init__()
+        self.temporal_encoder = model.temporal_encoder
+        self.gnn1 = _attention(model.gnn1)
+        self.gnn2 = _attention(model.gnn2)
+        self.impact_head = model.impact_head
+        self.uncertainty_head = model.uncertainty_head
+
+    def forward(self, short_features, medium_features, long_features, edge_index, edge_attr):
+        temporal_emb = self.temporal_encoder(short_features, medium_features, long_features)
+
+        if edge_index.size(1) == 0:
+            gnn_out2 = temporal_emb
+        else:
+            row, col = edge_index[0], edge_index[1]
+            edge_weights = edge_attr.unsqueeze(-1) if edge_attr.dim() == 1 else edge_attr
+            gnn_out1 = F.relu(self.gnn1(temporal_emb, row, col, edge_weights))
+            gnn_out2 = F.relu(self.gnn2(gnn_out1, row, col, edge_weights))
+            gnn_out2 = gnn_out2 + temporal_emb
+
+        impact = torch.tanh(self.impact_head(gnn_out2)).squeeze()
+        uncertainty = torch.sigmoid(self.uncertainty_head(gnn_out2)).squeeze()
+        return impact, uncertainty
+
+def script_model(model):
+    """Frozen TorchScript module with the eager model's call signature and outputs"""
+    model.eval()
+    return torch.jit.freeze(torch.jit.script(ScriptableTemporalGNN(model).eval()))
+
+def export_model(model, path):
+    """Write the scripted model to `path`; torch.jit.load(path) runs it without this codebase"""
+    scripted = script_model(model)
+    scripted.save(path)
+    return scripted
+
+def load_model(path, backend=Config.inference_backend, precision=Config.inference_precision, mmap=False):
+    """TemporalGNN checkpoint for inference on the given backend ('eager' or 'torchscript') and
+    precision ('fp32', 'int8' or 'bf16', see train/quantize.py).
+
+    With mmap the parameters stay backed by the mapped file (eager fp32 only; scripting
+    and precision changes make their own copies).
+    """
+    model = TemporalGNN()
+    model.load_state_dict(torch.load(path, map_location='cpu', mmap=mmap), assign=mmap)
+    model = quantize_model(model, precision)
+    if backend == 'torchscript':
+        model = script_model(model)
+    elif backend != 'eager':
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return ReducedPrecision(model) if precision == 'bf16' else model
+
+def sample_inputs(n_nodes, n_graphs=1, seed=0):
+    """Random disjoint-union batch of n_graphs portfolios with n_nodes stocks each, shaped like serving inputs"""
+    rng = np.random.default_rng(seed)
+    edge_indices, edge_attrs = [], []
+    for g in range(n_graphs):
+        returns = rng.normal(size=(30, n_nodes)) + rng.normal(size=(30, 1))
+        edge_index, edge_attr = build_edges(np.atleast_2d(np.corrcoef(returns, rowvar=False)), threshold=0.1)
+        edge_indices.append(edge_index + g * n_nodes)
+        edge_attrs.append(edge_attr)
+
+    n_total = n_nodes * n_graphs
+    features = {
+        timeframe: torch.from_numpy(rng.normal(size=(n_total, length, Config.feature_dim)).astype(np.float32))
+        for timeframe, (_, _, length) in Config.timeframes.items()
+    }
+    return features['short'], features['medium'], features['long'], torch.cat(edge_indices, dim=1), torch.cat(edge_attrs)
+
+def check_parity(model, exported, sizes=(1, 2, 4, 12, 50), batch_sizes=(1, 8)):
+    """Largest absolute difference between the eager and exported outputs over sample graphs"""
+    worst = 0.0
+    with torch.no_grad():
+        for n_nodes in sizes:
+            for n_graphs in batch_sizes:
+                inputs = sample_inputs(n_nodes, n_graphs, seed=n_nodes * 100 + n_graphs)
+                for expected, actual in zip(model(*inputs), exported(*inputs)):
+                    worst = max(worst, (expected - actual).abs().max().item())
+                # Graph without edges takes the encoder-only branch
+                no_edges = inputs[:3] + (torch.empty((2, 0), dtype=torch.long), torch.empty(0))
+                for expected, actual in zip(model(*no_edges), exported(*no_edges)):
+                    worst = max(worst, (expected - actual).abs().max().item())
+    return worst
+
+def benchmark(model, inputs, repeats=200):
+    """Median milliseconds per forward pass"""
+    timings = []
+    with torch.no_grad():
+        for _ in range(10):
+            model(*inputs)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(*inputs)
+            timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+def main(args):
+    model = load_model(args.model, backend='eager')
+    exported = export_model(model, args.out) if args.out else script_model(model)
+
+    worst = check_parity(model, exported)
+    logger.info(f"Max |eager - torchscript| over sample graphs: {worst:.2e}")
+    if worst > args.tolerance:
+        raise SystemExit(f"Parity check failed: {worst:.2e} > {args.tolerance:.0e}")
+
+    # Every sample graph is within dense_attention_max_nodes, so check the scatter path on its own too
+    model.set_dense_max_nodes(0)
+    worst = check_parity(model, script_model(model))
+    model.set_dense_max_nodes(Config.dense_attention_max_nodes)
+    logger.info(f"Max |eager - torchscript| with dense attention disabled: {worst:.2e}")
+    if worst > args.tolerance:
+        raise SystemExit(f"Parity check failed on the sparse path: {worst:.2e} > {args.tolerance:.0e}")
+
+    for n_nodes, n_graphs in [(4, 1), (12, 1), (50, 1), (12, 16), (12, 64)]:
+        inputs = sample_inputs(n_nodes, n_graphs)
+        eager_ms, exported_ms = benchmark(model, inputs), benchmark(exported, inputs)
+        logger.info(f"  {n_graphs} x {n_nodes} nodes: eager {eager_ms:.3f}ms, torchscript {exported_ms:.3f}ms "
+                    f"({eager_ms / exported_ms:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export TemporalGNN to TorchScript, check parity and benchmark")
+    parser.add_argument("--model", default=str(Config.model_dir / "temporal_gnn_2.pt"))
+    parser.add_argument("--out", default=None, help="where to save the scripted model (default: don't save)")
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    main(parser.parse_args())
@@ -0,0 +1,74 @@
+import time
+import logging
+import argparse
+import torch
+import numpy as np
+from data.core import StockData
+from train.dataset import portfolio_loader
+from train.trainer import CurriculumTrainer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def stream(stock_data, args, workers):
+    """(stocks, targets) of every minibatch the loader yields with this many workers"""
+    loader = portfolio_loader(stock_data, args.size, args.batch_size, args.check_steps, seed=args.seed, workers=workers)
+    return [(minibatch['stocks'], minibatch['targets']) for minibatch in loader]
+
+def check_determinism(stock_data, args):
+    """Raise SystemExit unless every worker count yields the same minibatch stream"""
+    reference = stream(stock_data, args, 0)
+    for workers in args.workers:
+        for step, ((stocks, targets), (expected_stocks, expected_targets)) in enumerate(
+                zip(stream(stock_data, args, workers), reference)):
+            if stocks != expected_stocks or not torch.equal(targets, expected_targets):
+                raise SystemExit(f"Step {step} differs between 0 and {workers} workers")
+
+def steps_per_second(trainer, args, workers):
+    """(steps/s, seconds waiting on data, seconds in forward/backward) of train_phase's loop"""
+    loader = portfolio_loader(trainer.data_helper, args.size, args.batch_size, args.steps, seed=args.seed,
+                              workers=workers)
+    data_time, step_time = 0.0, 0.0
+    began = start = time.perf_counter()
+    for minibatch in loader:
+        data_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        trainer.model.train()
+        trainer.optimizer.zero_grad()
+        impacts = trainer.forward_batches(minibatch['batches'])
+        loss = trainer.curriculum_loss(impacts, minibatch['targets'])
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(trainer.model.parameters(), 1.0)
+        trainer.optimizer.step()
+        step_time += time.perf_counter() - start
+        start = time.perf_counter()
+    return args.steps / (time.perf_counter() - began), data_time, step_time
+
+def main(args):
+    torch.manual_seed(args.seed)
+    trainer = CurriculumTrainer()
+    if args.ignore_expiry:
+        trainer.data_helper.price_store.cache_expiry_days = float('inf')
+
+    check_determinism(trainer.data_helper, args)
+    logger.info(f"Minibatch stream identical with 0 and {args.workers} workers")
+
+    # workers=0 builds every minibatch inline on the training thread, as the loop before the loader did
+    for workers in [0] + args.workers:
+        rate, data_time, step_time = steps_per_second(trainer, args, workers)
+        logger.info(f"  workers={workers}: {rate:.2f} steps/s ({args.steps} steps of {args.batch_size} x "
+                    f"{args.size}-stock portfolios; waiting on data {data_time:.2f}s, "
+                    f"forward/backward {step_time:.2f}s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training steps/s with minibatches built inline vs in DataLoader "
+                                                 "workers, after checking the stream is worker-independent")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--steps", type=int, default=24)
+    parser.add_argument("--check-steps", type=int, default=6)
+    parser.add_argument("--size", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ignore-expiry", action="store_true", help="train on a cache older than its expiry")
+    main(parser.parse_args())
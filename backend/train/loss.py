@@ -1,12 +1,12 @@
 import torch
 import torch.nn.functional as F
 
-def curriculum_loss(trainer, impacts, data, stocks=None):
-    n_stocks = len(stocks)
-    
-    # Get actual next-day returns
+def portfolio_targets(data, stocks):
+    """Latest next-day returns of the portfolio's stocks, in node order"""
     latest_returns = data['timeframes']['short']['returns'].iloc[-1]
-    targets = torch.tensor([latest_returns[stock] for stock in stocks], dtype=torch.float32)
-    
+    return torch.tensor([latest_returns[stock] for stock in stocks], dtype=torch.float32)
+
+def curriculum_loss(trainer, impacts, targets):
+    """MSE of every node's predicted impact against its next-day return"""
     loss = F.mse_loss(impacts, targets)
     return loss
\ No newline at end of file
@@ -0,0 +1,101 @@
+import numpy as np
+
+# Weights of the combined validation score
+DIRECTION_WEIGHT = 0.5
+CORRELATION_WEIGHT = 0.3
+RANK_WEIGHT = 0.2
+
+def direction_accuracy(predictions, actuals):
+    """Share of stocks per row whose predicted and actual moves have the same sign"""
+    return (np.sign(predictions) == np.sign(actuals)).mean(axis=1)
+
+def row_correlation(predictions, actuals):
+    """Pearson correlation per row, clipped at 0 with undefined rows (zero variance) scored 0"""
+    predictions = predictions - predictions.mean(axis=1, keepdims=True)
+    actuals = actuals - actuals.mean(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.einsum('ij,ij->i', predictions, actuals) / np.sqrt(
+            np.einsum('ij,ij->i', predictions, predictions) * np.einsum('ij,ij->i', actuals, actuals))
+    return np.clip(np.nan_to_num(corr, nan=0.0), 0.0, 1.0)
+
+def rank_correlation(predictions, actuals):
+    """Spearman correlation of the rows' argsort orders, clipped at 0.
+
+    Matches the per-portfolio score, which ranks np.argsort(pred) against np.argsort(actual):
+    both are permutations of 0..n-1, so Spearman reduces to 1 - 6 sum(d^2) / (n (n^2 - 1)).
+    """
+    n = predictions.shape[1]
+    d = (np.argsort(predictions, axis=1) - np.argsort(actuals, axis=1)).astype(np.float64)
+    return np.maximum(1 - 6 * np.einsum('ij,ij->i', d, d) / (n * (n * n - 1)), 0.0)
+
+def accuracy_components(predictions, actuals):
+    """Direction, correlation, rank and combined scores for every row of (rows x stocks) matrices.
+
+    Same semantics as scoring each row on its own: single-stock rows score correlation 1
+    when the direction is right, and rows of two or fewer stocks reuse direction for rank.
+    """
+    predictions = np.atleast_2d(np.asarray(predictions, dtype=np.float64))
+    actuals = np.atleast_2d(np.asarray(actuals, dtype=np.float64))
+    n = predictions.shape[1]
+
+    direction = direction_accuracy(predictions, actuals)
+    correlation = row_correlation(predictions, actuals) if n > 1 else direction.copy()
+    rank = rank_correlation(predictions, actuals) if n > 2 else direction
+    return {
+        'direction': direction,
+        'correlation': correlation,
+        'rank': rank,
+        'combined': DIRECTION_WEIGHT * direction + CORRELATION_WEIGHT * correlation + RANK_WEIGHT * rank
+    }
+
+def combined_accuracy(predictions, actuals):
+    """Combined validation score per row"""
+    return accuracy_components(predictions, actuals)['combined']
+
+def score_rows(predictions, actuals):
+    """accuracy_components for lists of 1-D prediction/actual rows that may differ in length.
+
+    Rows are stacked per length and scored together, then returned in input order.
+    """
+    components = {name: np.empty(len(predictions)) for name in ('direction', 'correlation', 'rank', 'combined')}
+    by_length = {}
+    for i, row in enumerate(predictions):
+        by_length.setdefault(len(row), []).append(i)
+    for rows in by_length.values():
+        scores = accuracy_components(np.stack([predictions[i] for i in rows]), np.stack([actuals[i] for i in rows]))
+        for name, values in scores.items():
+            components[name][rows] = values
+    return components
+
+class AccuracyAccumulator:
+    """Running totals of the validation scores, fed one block of rows at a time.
+
+    Only per-component sums are kept, so a long backtest can be summarized without
+    holding its predictions or per-row scores.
+    """
+    def __init__(self):
+        self.count = 0
+        self.sums = {'direction': 0.0, 'correlation': 0.0, 'rank': 0.0, 'combined': 0.0}
+        self.combined_sumsq = 0.0
+
+    def update(self, predictions, actuals):
+        """Add a (rows x stocks) block; returns its combined score per row"""
+        components = accuracy_components(predictions, actuals)
+        return self.add(components)
+
+    def add(self, components):
+        """Add already computed components (as returned by accuracy_components)"""
+        for name in self.sums:
+            self.sums[name] += float(components[name].sum())
+        self.combined_sumsq += float(np.square(components['combined']).sum())
+        self.count += len(components['combined'])
+        return components['combined']
+
+    def summary(self):
+        """Mean of every component plus the standard deviation of the combined score"""
+        if self.count == 0:
+            return {name: 0.0 for name in [*self.sums, 'combined_std']}
+        means = {name: total / self.count for name, total in self.sums.items()}
+        variance = self.combined_sumsq / self.count - means['combined'] ** 2
+        means['combined_std'] = float(np.sqrt(max(variance, 0.0)))
+        return means
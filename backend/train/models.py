@@ -29,10 +29,12 @@ class TemporalEncoder(nn.Module):
         return self.fusion(combined)
 
 class AttentionGraphSAGE(MessagePassing):
-    def __init__(self, in_channels, out_channels):
+    def __init__(self, in_channels, out_channels, dense_max_nodes=Config.dense_attention_max_nodes):
         super().__init__(aggr='add')
         self.lin = nn.Linear(in_channels, out_channels, bias=False)
         self.attention = nn.Linear(2 * out_channels + 1, 1) 
+        # Graphs (or disjoint-union batches) up to this many nodes use dense_forward
+        self.dense_max_nodes = dense_max_nodes
 
         nn.init.xavier_uniform_(self.lin.weight)
         nn.init.xavier_uniform_(self.attention.weight)
@@ -41,10 +43,16 @@ class AttentionGraphSAGE(MessagePassing):
     def forward(self, x, edge_index, edge_attr):
         x = self.lin(x)
         
+        edge_weights = edge_attr.unsqueeze(-1) if edge_attr.dim() == 1 else edge_attr
+        # Quantized attention layers have no plain weight tensor to split
+        if x.size(0) <= self.dense_max_nodes and isinstance(self.attention.weight, torch.Tensor):
+            dense = self.dense_forward(x, edge_index, edge_weights)
+            if dense is not None:
+                return dense
+        
         row, col = edge_index
         x_i, x_j = x[row], x[col]
         
-        edge_weights = edge_attr.unsqueeze(-1) if edge_attr.dim() == 1 else edge_attr
         alpha_input = torch.cat([x_i, x_j, edge_weights], dim=-1)
         attention_scores = self.attention(alpha_input).squeeze()
         attention_weights = softmax(attention_scores, row)
@@ -54,6 +62,42 @@ class AttentionGraphSAGE(MessagePassing):
     def message(self, x_j, attention):
         return attention.view(-1, 1) * x_j
 
+    def dense_forward(self, x, edge_index, edge_weights):
+        """dense_attention with this layer's weights; None when edge_index repeats an edge,
+        which the dense layout cannot hold"""
+        row, col = edge_index[0], edge_index[1]
+        counts = dense_edge_counts(x, row, col)
+        if counts.max() > 1:
+            return None
+        return dense_attention(x, row, col, edge_weights, self.attention.weight[0], self.attention.bias, counts)
+
+def dense_edge_counts(x, row, col):
+    """(N x N) number of edges from each node to each node"""
+    n_nodes = x.size(0)
+    return x.new_zeros(n_nodes, n_nodes).index_put_([row, col], x.new_ones(row.size(0)), accumulate=True)
+
+def dense_attention(x, row, col, edge_weights, weight, bias, counts):
+    """AttentionGraphSAGE's sparse attention and aggregation as N x N matrices, for small graphs.
+
+    The attention Linear over [x_i, x_j, edge] splits into a source projection, a target
+    projection and an edge term, which broadcast into an N x N score matrix; a softmax
+    over each row's edges and one matmul replace the gather / scatter / propagate.
+    """
+    n_nodes, channels = x.size(0), x.size(1)
+    source = x @ weight[:channels]
+    target = x @ weight[channels:2 * channels]
+    edge_term = x.new_zeros(n_nodes, n_nodes).index_put_([row, col], edge_weights[:, 0] * weight[2 * channels])
+
+    scores = source.unsqueeze(1) + target.unsqueeze(0) + edge_term + bias
+    scores = scores.masked_fill(counts == 0, float('-inf'))
+    maxes = scores.detach().amax(dim=1, keepdim=True)
+    maxes = maxes.masked_fill(torch.isinf(maxes), 0.0)
+    exp = (scores - maxes).exp()
+    attention = exp / (exp.sum(dim=1, keepdim=True) + 1e-16)
+
+    # out[c] = sum over edges (r, c) of attention[r, c] * x[r], as in propagate
+    return attention.t() @ x
+
 class TemporalGNN(nn.Module):
     def __init__(self, feature_dim=Config.feature_dim, temporal_dim=Config.temporal_dim, gnn_dim=Config.gnn_dim):
         super().__init__()
@@ -80,3 +124,7 @@ class TemporalGNN(nn.Module):
         uncertainty = torch.sigmoid(self.uncertainty_head(gnn_out2)).squeeze()
         
         return impact, uncertainty
+
+    def set_dense_max_nodes(self, max_nodes):
+        """Node count up to which both attention layers take the dense path (0 always runs sparse)"""
+        self.gnn1.dense_max_nodes = self.gnn2.dense_max_nodes = max_nodes
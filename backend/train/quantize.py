@@ -0,0 +1,125 @@
+import os
+import io
+import copy
+import logging
+import argparse
+import multiprocessing
+import torch
+import torch.nn as nn
+import numpy as np
+from config.settings import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ('fp32', 'int8', 'bf16')
+
+class ReducedPrecision(nn.Module):
+    """Runs a bfloat16 model behind the float32 interface: float inputs are cast down, outputs back up"""
+    def __init__(self, model, dtype=torch.bfloat16):
+        super().__init__()
+        self.model = model
+        self.dtype = dtype
+
+    def forward(self, short_features, medium_features, long_features, edge_index, edge_attr):
+        impact, uncertainty = self.model(
+            short_features.to(self.dtype), medium_features.to(self.dtype), long_features.to(self.dtype),
+            edge_index, edge_attr.to(self.dtype)
+        )
+        return impact.float(), uncertainty.float()
+
+def quantize_model(model, precision=Config.inference_precision):
+    """Eval-mode TemporalGNN converted to the given precision (a copy, except for 'fp32').
+
+    'int8' dynamically quantizes every nn.GRU and nn.Linear (temporal encoders, fusion,
+    both attention layers and the heads): int8 weights, activations quantized per call.
+    'bf16' casts the weights to bfloat16; wrap the result (or its scripted form) in
+    ReducedPrecision to call it with float32 inputs.
+    """
+    model.eval()
+    if precision == 'fp32':
+        return model
+    if precision == 'int8':
+        return torch.ao.quantization.quantize_dynamic(model, {nn.GRU, nn.Linear}, dtype=torch.qint8)
+    if precision == 'bf16':
+        return copy.deepcopy(model).to(torch.bfloat16)
+    raise ValueError(f"Unknown inference precision: {precision}")
+
+def weight_bytes(model):
+    """Size of the model's serialized state (int8 modules store packed weights)"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+def _rss_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+
+def _measure_rss(model_path, precision, backend, queue):
+    from train.export import load_model, sample_inputs
+    torch.set_num_threads(1)
+    inputs = sample_inputs(12, 16)
+    before = _rss_kb()
+    model = load_model(model_path, backend, precision)
+    with torch.no_grad():
+        model(*inputs)
+    queue.put((before, _rss_kb()))
+
+def measure_rss(model_path, precision, backend='eager'):
+    """(RSS before loading, RSS after loading and one batched forward) in KB, in a fresh process"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure_rss, args=(model_path, precision, backend, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main(args):
+    from data.sources import CSVPriceSource
+    from train.backtest_engine import HistoryPanel
+    from train.export import load_model, sample_inputs, benchmark
+    from train.metrics import AccuracyAccumulator
+    from train.walk_forward import walk_forward
+
+    tickers = sorted(file[:-len('.csv')] for file in os.listdir(args.csv_dir) if file.endswith('.csv'))
+    panel = HistoryPanel.from_source(CSVPriceSource(args.csv_dir), tickers, start=None)
+    rng = np.random.default_rng(args.seed)
+    portfolios = [rng.choice(tickers, size=args.size, replace=False).tolist() for _ in range(args.portfolios)]
+    sizes = [(4, 1), (12, 1), (50, 1), (12, 16)]
+    samples = {size: sample_inputs(*size) for size in sizes}
+
+    reference, reference_outputs = None, {}
+    for precision in PRECISIONS:
+        model = load_model(args.model, args.backend, precision)
+
+        accumulator = AccuracyAccumulator()
+        accuracies = walk_forward(model, panel, portfolios, accumulator=accumulator)
+        summary = accumulator.summary()
+        if reference is None:
+            reference = accuracies
+        logger.info(f"{precision}: accuracy {summary['combined']:.2%} (direction {summary['direction']:.2%}, "
+                    f"corr {summary['correlation']:.4f}, rank {summary['rank']:.4f}), "
+                    f"max per-date change vs fp32 {np.abs(accuracies.to_numpy() - reference.to_numpy()).max():.4f}")
+
+        with torch.no_grad():
+            outputs = {size: model(*inputs)[0] for size, inputs in samples.items()}
+        if not reference_outputs:
+            reference_outputs = outputs
+        drift = max((outputs[size] - reference_outputs[size]).abs().max().item() for size in sizes)
+        timings = ", ".join(f"{n_graphs}x{n_nodes} {benchmark(model, samples[(n_nodes, n_graphs)]):.2f}ms"
+                            for n_nodes, n_graphs in sizes)
+        before, after = measure_rss(args.model, precision, args.backend)
+        weights = quantize_model(load_model(args.model, 'eager', 'fp32'), precision)
+        logger.info(f"  max |impact - fp32| {drift:.2e}; latency {timings}; "
+                    f"weights {weight_bytes(weights) / 1024:.0f}KB; RSS {before / 1024:.1f}MB -> {after / 1024:.1f}MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy, latency and memory of fp32 / int8 / bf16 inference")
+    parser.add_argument("--csv-dir", required=True, help="price fixture for the walk-forward accuracy comparison")
+    parser.add_argument("--model", default=str(Config.model_dir / "temporal_gnn_2.pt"))
+    parser.add_argument("--backend", default='eager', choices=['eager', 'torchscript'])
+    parser.add_argument("--portfolios", type=int, default=5)
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
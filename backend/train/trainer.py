@@ -1,9 +1,11 @@
+import time
 import torch
 import logging
 import torch.nn.functional as F
 import numpy as np
 import pandas as pd
 from data.core import StockData
+from train.dataset import portfolio_loader
 from train.models import TemporalGNN
 from config.settings import Config
 
@@ -24,7 +26,7 @@ class CurriculumTrainer:
         
         for phase, config in enumerate(curriculum):
             logger.info(f"\nCurriculum Phase {phase + 1}: {config['name']}")
-            self.train_phase(config['size'], config['epochs'], phase)
+            self.train_phase(config['size'], config['epochs'], phase, config.get('batch_size', 1))
             
             # Validate after each phase
             val_accuracy = self.robust_validation(config['size'])
@@ -34,42 +36,29 @@ class CurriculumTrainer:
                 'accuracy': val_accuracy
             })
     
-    def train_phase(self, portfolio_size, epochs, phase):
-        """Train on random portfolios of specific size"""
+    def train_phase(self, portfolio_size, epochs, phase, batch_size=1):
+        """Train on minibatches of random portfolios of specific size"""
         learning_rate = Config.learning_rates[phase] if phase < len(Config.learning_rates) else 0.0001
         
         # Update optimizer for this phase
         for param_group in self.optimizer.param_groups:
             param_group['lr'] = learning_rate
         
-        for epoch in range(1, 1 + epochs):
-            # New random portfolio each epoch
-            stocks = self.data_helper.sample_random_portfolio(portfolio_size)
-            data = self.data_helper.get_multi_timeframe_data(stocks)
+        # New random portfolios each epoch, assembled by loader workers while the model trains
+        loader = portfolio_loader(self.data_helper, portfolio_size, batch_size, epochs,
+                                  seed=np.random.randint(2**31))
+
+        data_time, step_time = 0.0, 0.0
+        start = time.perf_counter()
+        for epoch, minibatch in enumerate(loader, 1):
+            data_time += time.perf_counter() - start
             
+            start = time.perf_counter()
             self.model.train()
             self.optimizer.zero_grad()
             
-            # Get features with proper shape handling
-            short_features = data['timeframes']['short']['features']
-            medium_features = data['timeframes']['medium']['features']
-            long_features = data['timeframes']['long']['features']
-            
-            # Add sequence dimension if needed (for GRU)
-            if short_features.dim() == 2:
-                short_features = short_features.unsqueeze(1)
-                medium_features = medium_features.unsqueeze(1)
-                long_features = long_features.unsqueeze(1)
-            
-            impacts, uncertainties = self.model(
-                short_features,
-                medium_features, 
-                long_features,
-                data['graph'].edge_index,
-                data['graph'].edge_attr
-            )
-  
-            loss = self.curriculum_loss(impacts, data, stocks)
+            impacts = self.forward_batches(minibatch['batches'])
+            loss = self.curriculum_loss(impacts, minibatch['targets'])
             loss.backward()
 
             grad_norm = 0
@@ -82,6 +71,8 @@ class CurriculumTrainer:
             
             torch.nn.utils.clip_grad_norm_(self.model.parameters(), 1.0)
             self.optimizer.step()
+            step_time += time.perf_counter() - start
+            start = time.perf_counter()
             
             # Diagnostics
             if epoch % 10 == 0:
@@ -91,4 +82,34 @@ class CurriculumTrainer:
                 logger.info("""\nEpoch %d: \n- Grad Norm: %.4f \n- Loss: %.4f \n- Impacts - Range: %.4f, Std: %.4f""", 
                 epoch, grad_norm, loss.item(), impact_range, impact_std)
 
-    
\ No newline at end of file
+        portfolios = epochs * batch_size
+        logger.info("  Throughput: %.1f portfolios/s (batch %d; waiting on data %.2fs, forward/backward %.2fs)",
+                    portfolios / max(data_time + step_time, 1e-9), batch_size, data_time, step_time)
+
+    def forward_batches(self, batches):
+        """Impacts of every portfolio's nodes, concatenated in portfolio order.
+
+        batches come from collate_portfolios: disjoint-union graphs with stacked GRU
+        sequences, so the whole minibatch shares one forward (one per sequence-length group).
+        """
+        pieces = [None] * sum(len(indices) for indices, _ in batches)
+        for indices, batch in batches:
+            short_features, medium_features, long_features = batch.x, batch.medium, batch.long
+            
+            # Add sequence dimension if needed (for GRU)
+            if short_features.dim() == 2:
+                short_features = short_features.unsqueeze(1)
+                medium_features = medium_features.unsqueeze(1)
+                long_features = long_features.unsqueeze(1)
+            
+            impacts, _ = self.model(
+                short_features,
+                medium_features,
+                long_features,
+                batch.edge_index,
+                batch.edge_attr
+            )
+            impacts = impacts.reshape(-1)
+            for k, i in enumerate(indices):
+                pieces[i] = impacts[batch.ptr[k]:batch.ptr[k + 1]]
+        return torch.cat(pieces)
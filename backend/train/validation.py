@@ -1,9 +1,9 @@
 import torch
 import logging
 import numpy as np
-import pandas as pd
-from scipy.stats import spearmanr
-from data.features import create_advanced_features
+from data.features import compute_snapshot_features, pct_returns
+from data.graph import correlation_matrix, build_edges
+from train.metrics import accuracy_components
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,26 +12,12 @@ def validate_on_date(trainer, stocks, date):
     """Realistic validation using only data available up to the test date"""
     try:
         historical_data = trainer.data_helper.get_historical_snapshot(stocks, date)
-        actual_moves = historical_data['actual_moves'].iloc[-1]
+        inputs, actual_moves = snapshot_inputs(historical_data, stocks)
         
-        # Use the snapshot data directly for features
-        prices = historical_data['prices']
-        returns = prices.pct_change().dropna()
-        
-        # Create features from the historical snapshot (no future data)
         with torch.no_grad():
-            # Build features from available historical data
-            short_features = _create_features_from_snapshot(prices.iloc[-30:], returns.iloc[-30:], stocks, trainer)
-            medium_features = _create_features_from_snapshot(prices.iloc[-60:], returns.iloc[-60:], stocks, trainer)  
-            long_features = _create_features_from_snapshot(prices, returns, stocks, trainer)
-            
-            # Build correlation graph from historical returns only
-            corr_matrix = returns.corr().fillna(0)
-            edge_index, edge_attr = _build_graph_from_correlation(corr_matrix, stocks)
-            
             # Run model inference
             predicted_impacts, _ = trainer.model(
-                short_features, medium_features, long_features, edge_index, edge_attr
+                inputs['short'], inputs['medium'], inputs['long'], inputs['edge_index'], inputs['edge_attr']
             )
         
         accuracy = _calculate_prediction_accuracy(predicted_impacts, actual_moves, stocks)
@@ -41,6 +27,25 @@ def validate_on_date(trainer, stocks, date):
         logger.error(f"  Validation error on {date}: {e}")
         return 0.5
 
+def snapshot_inputs(historical_data, stocks):
+    """Model inputs and the actual moves to score them against for one historical snapshot"""
+    actual_moves = historical_data['actual_moves'].iloc[-1]
+    
+    # Use the snapshot data directly for features
+    prices = historical_data['prices']
+    returns = pct_returns(prices)
+    
+    # Create features from the historical snapshot (no future data)
+    inputs = {
+        'short': _create_features_from_snapshot(prices.iloc[-30:], returns.iloc[-30:], stocks),
+        'medium': _create_features_from_snapshot(prices.iloc[-60:], returns.iloc[-60:], stocks),
+        'long': _create_features_from_snapshot(prices, returns, stocks)
+    }
+    
+    # Build correlation graph from historical returns only
+    inputs['edge_index'], inputs['edge_attr'] = build_edges(correlation_matrix(returns), threshold=0.1)
+    return inputs, actual_moves
+
 
 def robust_validation(trainer, portfolio_size):
     """Temporal validation across multiple periods"""
@@ -59,73 +64,31 @@ def robust_validation(trainer, portfolio_size):
     return avg_accuracy
 
 
-def _create_features_from_snapshot(prices, returns, stocks, trainer):
+def _create_features_from_snapshot(prices, returns, stocks):
     """Create feature tensor from historical price/return data"""
-    features = []
-    for stock in stocks:
+    present = [stock for stock in stocks if stock in prices.columns]
+    snapshot_features = compute_snapshot_features(
+        prices[present].to_numpy(dtype=np.float64), returns[present].to_numpy(dtype=np.float64)
+    )
+    
+    features = np.zeros((len(stocks), 8))
+    rows = iter(snapshot_features)
+    for i, stock in enumerate(stocks):
         if stock in prices.columns:
-            stock_features = create_advanced_features(
-                prices[stock], returns[stock] if stock in returns.columns else pd.Series([0]*len(prices))
-            )
-            features.append(stock_features)
-        else:
-            features.append(np.zeros(8))
+            features[i] = next(rows)
     
-    feature_tensor = torch.tensor(np.array(features), dtype=torch.float32)
+    feature_tensor = torch.tensor(features, dtype=torch.float32)
     return feature_tensor.unsqueeze(1)
 
-def _build_graph_from_correlation(corr_matrix, stocks):
-    """Build graph edges from correlation matrix"""
-    edges = []
-    edge_weights = []
-    
-    n_stocks = len(stocks)
-    for i in range(n_stocks):
-        for j in range(i + 1, n_stocks):
-            corr = corr_matrix.iloc[i, j]
-            if abs(corr) > 0.1:
-                edges.extend([[i, j], [j, i]])
-                edge_weights.extend([corr, corr])
-    
-    edge_index = torch.tensor(edges, dtype=torch.long).t().contiguous() if edges else torch.empty(2, 0, dtype=torch.long)
-    edge_attr = torch.tensor(edge_weights, dtype=torch.float32) if edge_weights else torch.empty(0, dtype=torch.float32)
-    
-    return edge_index, edge_attr
-
 def _calculate_prediction_accuracy(predicted_impacts, actual_moves, stocks):
     """Calculate realistic accuracy metrics"""
-    pred_np = predicted_impacts.cpu().numpy()
-    actual_np = actual_moves.values
-    
-    # 1. Direction accuracy
-    direction_correct = np.sign(pred_np) == np.sign(actual_np)
-    direction_accuracy = np.mean(direction_correct)
-    
-    # 2. Correlation between predicted and actual moves
-    if len(stocks) > 1:
-        correlation = np.corrcoef(pred_np, actual_np)[0, 1]
-        correlation = 0 if np.isnan(correlation) else max(0, correlation)
-    else:
-        correlation = 1.0 if direction_correct[0] else 0.0
-    
-    # 3. Rank correlation
-    if len(stocks) > 2:
-        pred_ranks = np.argsort(pred_np)
-        actual_ranks = np.argsort(actual_np)
-        rank_correlation = spearmanr(pred_ranks, actual_ranks).correlation
-        rank_correlation = 0 if np.isnan(rank_correlation) else max(0, rank_correlation)
-    else:
-        rank_correlation = direction_accuracy
-    
-    # Combined accuracy score
-    combined_accuracy = (
-        0.5 * direction_accuracy + 
-        0.3 * correlation + 
-        0.2 * rank_correlation
+    scores = accuracy_components(predicted_impacts.cpu().numpy()[None], actual_moves.values[None])
+    direction_accuracy, correlation, rank_correlation = (
+        scores['direction'][0], scores['correlation'][0], scores['rank'][0]
     )
     
     if np.random.random() < 0.1:
         logger.info(f"    Sample validation: Dir={direction_accuracy:.1%}, "
             f"Corr={correlation:.3f}, Rank={rank_correlation:.3f}")
     
-    return combined_accuracy
\ No newline at end of file
+    return scores['combined'][0]
\ No newline at end of file